@@ -2,14 +2,9 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from textblob import TextBlob
-
-# Load the dataset
-df = pd.read_csv("processed_reviews_textblob.csv")
-
-# Convert date and filter valid dates
-df['commented_date'] = pd.to_datetime(df['commented_date'], errors='coerce')
-df = df.dropna(subset=['commented_date'])
+from aspect_cube import update_cube
+from dataset_store import load_dataset
+from sentiment_cache import get_cache
 
 # Define aspect columns
 aspect_columns = [
@@ -17,6 +12,12 @@ aspect_columns = [
     "soundtrack", "difficulty", "collaboration", "performance", "replayability"
 ]
 
+# Load the dataset (only the columns used below; dates, days since release and before/after come typed)
+df = load_dataset("reviews", columns=["genre", "game", "commented_date", "days_since_release", "commented", "comment", "comment_sentiment"])
+
+# Aspect counts per month/genre/game/source/before-after, updated with the reviews added since the last run
+cube = update_cube()
+
 # --- Sentiment Distribution ---
 sns.countplot(x="comment_sentiment", data=df)
 plt.title("Comment Sentiment Distribution")
@@ -31,37 +32,36 @@ plt.xticks(rotation=45)
 plt.tight_layout()
 plt.show()
 
+# --- Sentiment Around Release (30-day buckets, 360 days either side) ---
+around_release = df[df['days_since_release'].between(-360, 359)]  # 12 full buckets either side
+release_buckets = around_release.groupby([around_release['days_since_release'] // 30 * 30, 'comment_sentiment']).size().unstack(fill_value=0)
+sns.lineplot(data=release_buckets)
+plt.axvline(0, color="grey", linestyle="--")
+plt.title("Sentiment by Days Since Release")
+plt.xlabel("days since release")
+plt.tight_layout()
+plt.show()
+
 # --- TextBlob Sentiment Recalculation ---
-sample_df = df.sample(10000, random_state=42).copy()
-sample_df['textblob_polarity'] = sample_df['comment'].apply(lambda x: TextBlob(str(x)).sentiment.polarity)
-sample_df['textblob_sentiment'] = sample_df['textblob_polarity'].apply(lambda p: 'positive' if p > 0.1 else 'negative' if p < -0.1 else 'neutral')
-pd.crosstab(sample_df['comment_sentiment'], sample_df['textblob_sentiment'])
+textblob_df = df.copy()  # Every comment: the scores come from the sentiment cache
+textblob_df['textblob_polarity'] = get_cache().scores(textblob_df['comment'])[0]
+textblob_df['textblob_sentiment'] = textblob_df['textblob_polarity'].apply(lambda p: 'positive' if p > 0.1 else 'negative' if p < -0.1 else 'neutral')
+pd.crosstab(textblob_df['comment_sentiment'], textblob_df['textblob_sentiment'])
 
 # --- Aspect Sentiment Over Time ---
-aspect_sentiments_long = df.melt(id_vars=["commented_date"], value_vars=aspect_columns, var_name="aspect", value_name="sentiment")
-aspect_sentiments_long = aspect_sentiments_long[aspect_sentiments_long["sentiment"] != "none"].copy()
-aspect_sentiments_long['month'] = aspect_sentiments_long['commented_date'].dt.to_period('M').dt.to_timestamp()
-aspect_time_counts = aspect_sentiments_long.groupby(["month", "aspect", "sentiment"]).size().reset_index(name="count")
+aspect_time_counts = cube.counts(["month", "aspect", "sentiment"])
 
 # --- Before vs After Analysis ---
-before_df = df[df['commented'] == 'before']
-after_df = df[df['commented'] == 'after']
-
-def aspect_sentiment_counts(sub_df):
-    sentiment_counts = {}
-    for col in aspect_columns:
-        sentiment_counts[col] = sub_df[col].value_counts()
-    return pd.DataFrame(sentiment_counts).fillna(0)
+def aspect_sentiment_counts(commented):
+    counts = cube.counts(["commented", "sentiment", "aspect"], include_none=True)
+    counts = counts[counts["commented"] == commented]
+    return counts.pivot_table(index="sentiment", columns="aspect", values="count", fill_value=0, observed=False)[aspect_columns].astype("int64")
 
-before_counts = aspect_sentiment_counts(before_df)
-after_counts = aspect_sentiment_counts(after_df)
+before_counts = aspect_sentiment_counts("before")
+after_counts = aspect_sentiment_counts("after")
 
 # --- Genre-Level Aspect Sentiment ---
-genre_sample_df = df.sample(50000, random_state=123)
-genre_sample_df = genre_sample_df[genre_sample_df[aspect_columns].ne("none").any(axis=1)]
-genre_aspect_sentiment = genre_sample_df.melt(id_vars=["genre"], value_vars=aspect_columns, var_name="aspect", value_name="sentiment")
-genre_aspect_sentiment = genre_aspect_sentiment[genre_aspect_sentiment["sentiment"] != "none"]
-genre_sentiment_counts = genre_aspect_sentiment.groupby(["genre", "aspect", "sentiment"]).size().reset_index(name="mention_count")
+genre_sentiment_counts = cube.counts(["genre", "aspect", "sentiment"]).rename(columns={"count": "mention_count"})
 
 # --- Visualization by Genre and Aspect ---
 top_genres = genre_sentiment_counts["genre"].value_counts().index[:5]
@@ -90,11 +90,7 @@ for aspect in ["performance", "graphics", "storyline", "gameplay", "difficulty",
     plot_aspect_sentiment_by_genre(aspect)
 
 # --- Before vs After Release Visualization ---
-before_after_sample = df.sample(50000, random_state=2025)
-before_after_sample = before_after_sample[before_after_sample[aspect_columns].ne("none").any(axis=1)]
-before_after_aspects = before_after_sample.melt(id_vars=["commented"], value_vars=aspect_columns, var_name="aspect", value_name="sentiment")
-before_after_aspects = before_after_aspects[before_after_aspects["sentiment"] != "none"]
-before_after_summary = before_after_aspects.groupby(["commented", "aspect", "sentiment"]).size().reset_index(name="mention_count")
+before_after_summary = cube.counts(["commented", "aspect", "sentiment"]).rename(columns={"count": "mention_count"})
 
 # --- Overall Comparison Chart ---
 plt.figure(figsize=(14, 8))
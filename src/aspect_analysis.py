@@ -1,27 +1,39 @@
+import re
+import numpy as np
 import pandas as pd
-from textblob import TextBlob
+from aspect_matcher import AspectMatcher
+from dataset_store import ASPECT_CODES, decode_aspects, load_dataset, write_dataset
+from sentiment_cache import get_cache
 
-# Define aspects to analyze
+# Define aspects to analyze. Keywords match whole words (plus a plural 's'/'es'), so the
+# other word forms that count ("difficulty", "laggy", "cheaper") are listed explicitly
 ASPECTS = {
-    "cost": ["cost", "price", "affordability", "expensive", "cheap", "discount", "pricing", "value"],
-    "graphics": ["graphics", "visuals", "art", "resolution", "textures", "design", "art style", "detail", "rendering", "clarity", "HD", "4K", "realism", "performance", "animation", "aesthetics"],
+    "cost": ["cost", "price", "affordability", "expensive", "cheap", "discount", "pricing", "value", "overpriced", "underpriced", "priced", "pricey", "cheaper", "cheapest", "discounted", "inexpensive"],
+    "graphics": ["graphics", "visuals", "art", "resolution", "textures", "design", "art style", "detail", "rendering", "clarity", "HD", "4K", "realism", "performance", "animation", "aesthetics", "artwork", "artistic", "detailed"],
     "platform": ["platform", "device", "system", "console", "pc", "cross-platform", "exclusive", "device compatibility", "hardware", "software environment"],
-    "storyline": ["storyline", "plot", "narrative", "characters", "dialogue", "writing", "script", "backstory", "lore", "depth", "twist", "theme", "world-building", "story"],
-    "gameplay": ["gameplay", "mechanics", "controls", "interaction", "combat", "exploration", "level design", "user experience", "playability", "fluidity", "pace", "challenge", "variety", "immersion", "customization", "user interaction"],
-    "soundtrack": ["music", "sound", "soundtrack", "audio", "bgm", "voice acting", "atmosphere", "sound design", "melody", "rhythm", "instrumental", "vocals", "audio design"],
-    "difficulty": ["difficult", "challenge", "skill level", "difficulty curve", "hard", "easy", "moderate", "intense", "frustrating", "beginner", "expert", "progressive", "complexity"],
-    "collaboration": ["multiplayer", "co-op", "online", "matchmaking", "pvp", "team", "competitive", "social", "cooperative", "lobby", "community", "group play", "collaboration"],
-    "performance": ["performance", "lag", "frame rate", "fps", "optimization", "stability", "smoothness", "load time", "render time", "glitch", "drop", "frame drops", "buffering", "scalability", "speed", "efficiency", "system performance"],
+    "storyline": ["storyline", "plot", "narrative", "characters", "dialogue", "writing", "script", "backstory", "lore", "depth", "twist", "theme", "world-building", "story", "storytelling"],
+    "gameplay": ["gameplay", "mechanics", "controls", "interaction", "combat", "exploration", "level design", "user experience", "playability", "fluidity", "pace", "challenge", "variety", "immersion", "customization", "user interaction", "paced"],
+    "soundtrack": ["music", "sound", "soundtrack", "audio", "bgm", "voice acting", "atmosphere", "sound design", "melody", "rhythm", "instrumental", "vocals", "audio design", "musical"],
+    "difficulty": ["difficult", "difficulty", "difficulties", "challenge", "skill level", "difficulty curve", "hard", "harder", "hardest", "hardcore", "easy", "moderate", "intense", "frustrating", "beginner", "expert", "progressive", "complexity"],
+    "collaboration": ["multiplayer", "co-op", "online", "matchmaking", "pvp", "team", "competitive", "social", "cooperative", "lobby", "community", "group play", "collaboration", "teammates", "teamwork", "teamplay"],
+    "performance": ["performance", "lag", "laggy", "lagging", "lagged", "frame rate", "fps", "30fps", "60fps", "120fps", "144fps", "optimization", "stability", "smoothness", "load time", "render time", "glitch", "glitchy", "glitched", "glitching", "drop", "frame drops", "buffering", "scalability", "speed", "efficiency", "system performance"],
     "replayability": ["replayability", "replay value", "longevity", "endgame", "post game", "replay options", "multiple endings", "progression", "game duration", "content depth"]
 }
 
+# A sentence ends at . ! or ? followed by whitespace, or at a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
 def calculate_sentiment(text):
     """
-    Perform sentiment analysis using TextBlob.
+    Perform sentiment analysis using TextBlob (through the shared sentiment cache).
     Returns polarity (-1 to 1) which is used to classify sentiment.
     """
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
+    return polarity_label(get_cache().score(text)[0])
+
+def polarity_label(polarity):
+    """
+    Classify a polarity as positive, negative or neutral.
+    """
     if polarity > 0:
         return "positive"
     elif polarity < 0:
@@ -29,66 +41,99 @@ def calculate_sentiment(text):
     else:
         return "neutral"
 
+_matcher = None
+
+def get_matcher():
+    """The AspectMatcher for ASPECTS, compiled on first use."""
+    global _matcher
+    if _matcher is None:
+        _matcher = AspectMatcher(ASPECTS)
+    return _matcher
+
 def extract_aspects(review):
     """
     Extract relevant aspects from a game review.
-    Each aspect is tracked if mentioned in the review.
-    """
-    extracted_aspects = {aspect: "none" for aspect in ASPECTS}  # Initialize all aspects with "none"
-    # Tokenize the review
-    review = review.lower()
-    for aspect, keywords in ASPECTS.items():
-        for keyword in keywords:
-            if keyword in review:
-                # Ensures we don't miss a aspect "adjective"
-                extracted_aspects[aspect] = "mentioned"  # Mark the aspect as mentioned
-                break
-    return extracted_aspects
+    Each aspect is tracked if one of its keywords appears in the review as a whole word.
+    """
+    mentioned = get_matcher().mentioned(review)
+    return {aspect: "mentioned" if aspect in mentioned else "none" for aspect in ASPECTS}
+
+def split_sentences(review):
+    """
+    Split a review into its non-empty sentences.
+    """
+    return [sentence for sentence in SENTENCE_END.split(review.strip()) if sentence]
+
+def aspect_polarities(reviews):
+    """
+    Sentence-level aspect sentiment for many reviews at once.
+    Every review is split into sentences once; each sentence that mentions an
+    aspect is scored once and its polarity is credited only to the aspects it
+    mentions: in "Great story. Awful performance." storyline is positive and
+    performance negative. A sentence mentioning several aspects gives each of
+    them its score ("great story, awful performance." is one sentence, so both
+    get its overall polarity). Returns a (reviews x ASPECTS) array with the mean
+    polarity of the sentences mentioning each aspect, NaN where an aspect is not
+    mentioned.
+    """
+    sentences, owners = [], []
+    for row, review in enumerate(reviews):
+        for sentence in split_sentences(str(review)):
+            sentences.append(sentence)
+            owners.append(row)
+    flags = get_matcher().flags(sentences)
+
+    # Score only the sentences that mention something (the cache scores each distinct one once)
+    scored = np.flatnonzero(flags.any(axis=1))
+    polarity = get_cache().scores([sentences[i] for i in scored])[0]
+    mention_rows, mention_aspects = np.nonzero(flags[scored])
+    review_rows = np.array(owners, dtype=np.int64)[scored][mention_rows]
+
+    sums = np.zeros((len(reviews), len(ASPECTS)))
+    counts = np.zeros((len(reviews), len(ASPECTS)))
+    np.add.at(sums, (review_rows, mention_aspects), polarity[mention_rows])
+    np.add.at(counts, (review_rows, mention_aspects), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
 
 def aspect_based_sentiment(review):
     """
     Perform aspect-based sentiment analysis using TextBlob.
-    Returns a dictionary of aspect sentiments (positive, negative, or neutral).
+    Returns a dictionary of aspect sentiments (positive, negative, neutral or none),
+    each from the sentences of the review that mention the aspect.
     """
-    aspects = extract_aspects(review)
-    aspect_sentiments = {aspect: "none" for aspect in aspects}  # Initialize all aspects with "none"
-    for aspect in aspects.keys():
-        if aspects[aspect] == "mentioned":  # Only analyze if aspect is mentioned
-            sentiment = calculate_sentiment(review)
-            aspect_sentiments[aspect] = sentiment
+    polarities = aspect_polarities([review])[0]
+    return {aspect: "none" if np.isnan(polarity) else polarity_label(polarity)
+            for aspect, polarity in zip(ASPECTS, polarities)}
 
-    return aspect_sentiments
+def process_reviews(df):
+    """
+    Perform aspect-based sentiment analysis on every review of a DataFrame.
+    Adds one int8 column per aspect (0 none, 1 negative, 2 neutral, 3 positive).
+    """
+    # Sentence-level polarity of every mentioned aspect, for all reviews at once,
+    # stored as int8 codes (see dataset_store.ASPECT_CODES)
+    polarities = aspect_polarities(df['comment'].tolist())
+    codes = np.select(
+        [polarities < 0, polarities == 0, polarities > 0],
+        [ASPECT_CODES["negative"], ASPECT_CODES["neutral"], ASPECT_CODES["positive"]],
+        ASPECT_CODES["none"]  # NaN: not mentioned
+    ).astype(np.int8)
+    return df.assign(**{aspect: codes[:, i] for i, aspect in enumerate(ASPECTS)})
 
 def process_reviews_from_csv(csv_file, output_file):
     """
     Process reviews from a CSV file and perform aspect-based sentiment analysis.
     """
-    df = pd.read_csv(csv_file)
-    # Create new columns for each aspect, explicitly setting dtype to 'object' (supports string values)
-    for aspect in ASPECTS.keys():
-        df[aspect] = "none"  # Initialize all aspect columns with "none"
-
-    # Analyze each review
-    for index, row in df.iterrows():
-        comment = row['comment']  # Assuming 'comment' column exists
-        aspect_sentiments = aspect_based_sentiment(comment)
-
-        # Update aspect columns with the sentiment values
-        for aspect, sentiment in aspect_sentiments.items():
-            if sentiment != "none":  # Only assign sentiment if aspect is mentioned
-                df.at[index, aspect] = sentiment
-
-    # Convert all string-based sentiment values to lowercase
-    df = df.apply(lambda x: x.str.lower() if x.dtype == "object" else x)
-    df.to_csv(output_file, index=False)
+    df = process_reviews(pd.read_csv(csv_file))
+    decode_aspects(df).to_csv(output_file, index=False)
     print(f"Processed reviews saved to '{output_file}'.")
 
 def main():
-    csv_file = "../data/final_comment_dataset.csv"
-    output_file = "../data/processed_reviews.csv"
-    process_reviews_from_csv(csv_file, output_file)
-    
-    df = pd.read_csv(output_file)
+    df = process_reviews(load_dataset("comments"))
+    write_dataset(df, "reviews")
+
+    print(get_cache().report())
     num_comments = df['commented'].value_counts()
     print(f"Count of {num_comments}")
 
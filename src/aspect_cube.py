@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from dataset_store import ASPECT_COLUMNS, ASPECT_LABELS, STORE_DIR, load_dataset
+
+# Aspect mention counts of the reviews dataset, precomputed for analysis2.py.
+#
+# The cube holds one count per month x genre x game x source x before/after x
+# aspect x sentiment cell (only the non-empty cells), built in one vectorized
+# pass over the aspect code matrix. It has about 28k rows for the current 78k
+# reviews, so every chart becomes a small group-by instead of melting the
+# reviews (10 rows per review, 780k rows). The hashes of the counted reviews are
+# saved with it, one per review, so identical reviews (e.g. repeated spam
+# comments) are each counted; sync() only counts the reviews added since, and
+# rebuilds the cube when counted reviews were removed or changed.
+#
+#     python aspect_cube.py            # Update the cube from the reviews dataset
+#     python aspect_cube.py --rebuild  # Count everything again
+
+CUBE_DIR = os.path.join(STORE_DIR, "aspect_cube")
+DIMENSIONS = ["month", "genre", "game", "source", "commented"]
+# Columns of the reviews dataset the cube is built from
+COLUMNS = ["genre", "game", "source", "commented_date", "commented", "comment"] + ASPECT_COLUMNS
+
+def row_hashes(df):
+    """64-bit hash of every review (comment, dimensions and aspect codes)."""
+    return pd.util.hash_pandas_object(df[COLUMNS], index=False).to_numpy()
+
+def occurrences(hashes, values):
+    """How many times each of `values` occurs in `hashes`."""
+    unique, counts = np.unique(hashes, return_counts=True)
+    if not len(unique):
+        return np.zeros(len(values), dtype=np.int64)
+    positions = np.searchsorted(unique, values).clip(max=len(unique) - 1)
+    return np.where(unique[positions] == values, counts[positions], 0)
+
+def ranks(hashes):
+    """0 for the first row with a hash, 1 for the second, ... (in row order)."""
+    order = np.argsort(hashes, kind="stable")
+    _, first, counts = np.unique(hashes[order], return_index=True, return_counts=True)
+    ranks = np.empty(len(hashes), dtype=np.int64)
+    ranks[order] = np.arange(len(hashes)) - np.repeat(first, counts)
+    return ranks
+
+def count_reviews(df):
+    """Cube of the reviews in `df`: the DIMENSIONS, aspect, sentiment and count
+    of every non-empty cell ('none' counts reviews not mentioning the aspect)."""
+    cells = pd.DataFrame({
+        "month": df["commented_date"].dt.to_period("M").dt.to_timestamp(),
+        **{dimension: df[dimension] for dimension in DIMENSIONS[1:]}
+    })
+    cell_ids = cells.groupby(DIMENSIONS, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    n_cells = cell_ids.max() + 1 if len(cell_ids) else 0
+    _, first_rows = np.unique(cell_ids, return_index=True)
+
+    # One bincount over (cell, aspect, code) for every cell of the code matrix
+    codes = df[ASPECT_COLUMNS].to_numpy(dtype=np.int64)
+    n_aspects, n_labels = len(ASPECT_COLUMNS), len(ASPECT_LABELS)
+    flat = (cell_ids[:, None] * n_aspects + np.arange(n_aspects)) * n_labels + codes
+    counts = np.bincount(flat.ravel(), minlength=n_cells * n_aspects * n_labels)
+
+    nonzero = np.flatnonzero(counts)
+    cell, rest = np.divmod(nonzero, n_aspects * n_labels)
+    aspect, label = np.divmod(rest, n_labels)
+    cube = cells.iloc[first_rows[cell]].reset_index(drop=True)
+    cube["aspect"] = pd.Categorical.from_codes(aspect, ASPECT_COLUMNS)
+    cube["sentiment"] = pd.Categorical.from_codes(label, ASPECT_LABELS)
+    cube["count"] = counts[nonzero]
+    return cube
+
+def merge_cubes(*cubes):
+    """Sum the counts of several cubes cell by cell."""
+    cube = pd.concat(cubes, ignore_index=True)
+    return cube.groupby(DIMENSIONS + ["aspect", "sentiment"], observed=True, dropna=False, as_index=False)["count"].sum()
+
+class AspectCube:
+    """The saved cube (cube.parquet) and the hashes of the reviews it counts (rows.npy)."""
+
+    def __init__(self, cube_dir=None):
+        self.cube_dir = cube_dir or CUBE_DIR
+        self.cube_path = os.path.join(self.cube_dir, "cube.parquet")
+        self.rows_path = os.path.join(self.cube_dir, "rows.npy")
+        self.cube = None
+        self.rows = np.empty(0, dtype=np.uint64)
+        if os.path.exists(self.cube_path) and os.path.exists(self.rows_path):
+            try:
+                self.cube = pd.read_parquet(self.cube_path)
+                self.rows = np.load(self.rows_path)
+            except Exception as e:
+                print(f"Ignoring unreadable aspect cube in {self.cube_dir}: {e}")
+                self.cube, self.rows = None, np.empty(0, dtype=np.uint64)
+
+    def add(self, df):
+        """Count the reviews of `df` not counted yet. Returns how many were added.
+        A review that is in the cube k times is new from its (k+1)-th copy on."""
+        hashes = row_hashes(df)
+        new = ranks(hashes) >= occurrences(self.rows, hashes)
+        if new.any():
+            added = count_reviews(df[new])
+            self.cube = added if self.cube is None else merge_cubes(self.cube, added)
+            self.rows = np.concatenate([self.rows, hashes[new]])
+        return int(new.sum())
+
+    def sync(self, df, rebuild=False):
+        """Make the cube count exactly the reviews of `df`: add the new ones, or
+        count everything again if some counted reviews are gone or changed."""
+        counted, times = np.unique(self.rows, return_counts=True)
+        if rebuild or self.cube is None or (occurrences(row_hashes(df), counted) < times).any():
+            self.cube, self.rows = count_reviews(df.iloc[:0]), np.empty(0, dtype=np.uint64)
+            print(f"Counting all {self.add(df)} reviews into the aspect cube")
+        else:
+            print(f"Added {self.add(df)} new reviews to the aspect cube")
+
+    def save(self):
+        os.makedirs(self.cube_dir, exist_ok=True)
+        self.cube.to_parquet(self.cube_path, index=False)
+        np.save(self.rows_path, self.rows)
+
+    def counts(self, by, include_none=False):
+        """Summed counts grouped by `by` (e.g. ["genre", "aspect", "sentiment"]).
+        Only mentions unless `include_none`."""
+        cube = self.cube if include_none else self.cube[self.cube["sentiment"] != "none"]
+        counts = cube.groupby(by, observed=True, as_index=False)["count"].sum()
+        if not include_none and "sentiment" in counts.columns:
+            counts["sentiment"] = counts["sentiment"].cat.remove_unused_categories()  # No empty 'none' in legends
+        return counts
+
+def update_cube(rebuild=False, cube_dir=None):
+    """Bring the saved cube up to date with the reviews dataset and return it."""
+    cube = AspectCube(cube_dir)
+    cube.sync(load_dataset("reviews", columns=COLUMNS), rebuild)
+    cube.save()
+    return cube
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the aspect count cube of the reviews dataset.")
+    parser.add_argument("--rebuild", action="store_true", help="Count every review again")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cube = update_cube(args.rebuild)
+    print(f"{len(cube.cube)} cells, {len(cube.rows)} reviews ({time.perf_counter() - start:.1f}s)")
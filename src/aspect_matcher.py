@@ -0,0 +1,138 @@
+import argparse
+import re
+import numpy as np
+import pandas as pd
+
+# Find the aspect keywords of aspect_analysis.ASPECTS in reviews with one
+# compiled pattern.
+#
+# The keywords are compiled into a single regular expression shaped like a trie
+# (keywords sharing a prefix share a branch, e.g. "frame (rate|drops)"), wrapped
+# in word boundaries. re.finditer then scans each review once, left to right,
+# trying the trie at each position inside the C regex engine. An Aho-Corasick
+# automaton would do the same single pass, but written in Python it steps
+# through every character in the interpreter (several times slower than the
+# regex engine) and the C implementation (pyahocorasick) would be a new
+# dependency for ~130 keywords. Word boundaries are also simpler to express in
+# the pattern than to check after the fact.
+#
+# Matching rules:
+# - case-insensitive (reviews are lower-cased), whole words only ("art" does
+#   not match "start", "hard" does not match "hardware"), with an optional
+#   plural "s"/"es";
+# - spaces inside keywords match any whitespace ("frame  rate");
+# - the longest keyword wins where keywords overlap, and a hit counts for the
+#   aspects of every keyword it contains: "system performance" mentions
+#   platform ("system") as well as performance.
+
+PLURAL = r"(?:e?s)?"
+
+def _trie_pattern(keywords, space=r"\s+"):
+    """Regex matching any of the keywords, with shared prefixes factored out.
+    Longer continuations are tried first, so the longest keyword matches.
+    Spaces in keywords match `space`."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [(space if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+class AspectMatcher:
+    """Compiled matcher for {aspect: [keywords]}."""
+
+    def __init__(self, aspects):
+        self.aspects = list(aspects)
+        keyword_aspects = {}
+        for aspect, keywords in aspects.items():
+            for keyword in keywords:
+                keyword_aspects.setdefault(" ".join(keyword.lower().split()), set()).add(aspect)
+        # A hit also counts for the keywords inside it ("system performance" contains "system")
+        self.keyword_aspects = {}
+        for keyword in keyword_aspects:
+            contained = set()
+            for other, other_aspects in keyword_aspects.items():
+                if re.search(rf"\b{re.escape(other)}\b", keyword):
+                    contained |= other_aspects
+            self.keyword_aspects[keyword] = frozenset(contained)
+        # Reviews are lower-cased once before matching: re.IGNORECASE makes the scan about 3x slower
+        self.pattern = re.compile(rf"\b({_trie_pattern(self.keyword_aspects)}){PLURAL}\b")
+        self.columns = {aspect: i for i, aspect in enumerate(self.aspects)}
+
+    def keyword_of(self, text):
+        """The keyword a matched text stands for (spacing and plural removed)."""
+        return " ".join(text.split())
+
+    def find(self, review):
+        """Every keyword hit of a review: [(start, end, keyword, aspects)], in text
+        order. Positions are those of review.lower() (the same unless lower-casing
+        changes the length of some non-ASCII character)."""
+        hits = []
+        for match in self.pattern.finditer(review.lower()):
+            keyword = self.keyword_of(match.group(1))
+            hits.append((match.start(), match.end(), keyword, self.keyword_aspects[keyword]))
+        return hits
+
+    def mentioned(self, review):
+        """Set of aspects a review mentions."""
+        aspects = set()
+        for match in self.pattern.finditer(review.lower()):
+            aspects |= self.keyword_aspects[self.keyword_of(match.group(1))]
+        return aspects
+
+    def flags(self, reviews):
+        """Boolean matrix (reviews x aspects, in the order of `aspects`)."""
+        flags = np.zeros((len(reviews), len(self.aspects)), dtype=bool)
+        for row, review in enumerate(reviews):
+            for aspect in self.mentioned(str(review)):
+                flags[row, self.columns[aspect]] = True
+        return flags
+
+def substring_aspects(review, aspects):
+    """The previous extract_aspects loop (substring search), for comparison."""
+    review = review.lower()
+    found = set()
+    for aspect, keywords in aspects.items():
+        for keyword in keywords:
+            if keyword in review:
+                found.add(aspect)
+                break
+    return found
+
+def benchmark(data_dir, sample=None):
+    """Time the matcher against the substring loop on the scraped comments."""
+    from aspect_analysis import ASPECTS, get_matcher
+    from comment_benchmark import print_timings, sample_comments, timed
+
+    comments = sample_comments(data_dir, sample).tolist()
+    matcher = get_matcher()
+    old, loop_time = timed(lambda: [substring_aspects(comment, ASPECTS) for comment in comments])
+    new, matcher_time = timed(lambda: [matcher.mentioned(comment) for comment in comments])
+
+    print_timings(len(comments), {"substring loop": loop_time, "AspectMatcher": matcher_time})
+    changes = pd.DataFrame([
+        {"aspect": aspect, "substring loop": sum(aspect in found for found in old),
+         "AspectMatcher": sum(aspect in found for found in new),
+         "only substring": sum(aspect in a and aspect not in b for a, b in zip(old, new)),
+         "only matcher": sum(aspect in b and aspect not in a for a, b in zip(old, new))}
+        for aspect in ASPECTS
+    ])
+    print("Comments mentioning each aspect:")
+    print(changes.to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the aspect matcher against the substring loop.")
+    parser.add_argument("--data-dir", default="../data")
+    parser.add_argument("--sample", type=int, default=20000, help="Number of comments compared (0 = all)")
+    args = parser.parse_args()
+    benchmark(args.data_dir, args.sample)
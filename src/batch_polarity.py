@@ -0,0 +1,271 @@
+import argparse
+import re
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+from textblob import _text
+from textblob.en import sentiment as pattern_sentiment
+
+# Batch version of TextBlob's default sentiment (PatternAnalyzer).
+#
+# TextBlob tokenizes each text, then walks its tokens once, keeping two pieces of
+# state: the last modifier (a known adverb such as "very") and the last negation
+# ("not"). A known word either starts a new assessment or, right after a modifier,
+# is merged into the previous one; "!" boosts the last assessment, emoticons and
+# "(!)" add their own. This module computes the same thing for a whole batch:
+#
+# - the texts are tokenized as one joined string, splitting the punctuation off
+#   each distinct whitespace-separated chunk once (the corpus repeats the same
+#   words over and over), and the lexicon is looked up once per distinct token;
+# - the token walk is rewritten as array operations over the flat token stream
+#   of all texts: "is a modifier still in effect here" and "is a negation still
+#   in effect here" become forward-fills of the last modifier / negation position
+#   plus prefix counts of the tokens that cancel them, and assessments become
+#   groups of tokens aggregated with bincount.
+#
+# Scores match TextBlob(text).sentiment within TOLERANCE. Known difference:
+# TextBlob matches emoticons split over tokens (": )") sentence by sentence, here
+# over the whole text, which only matters for an emoticon split around a
+# sentence end.
+
+TOLERANCE = 1e-9  # Largest difference to TextBlob(text).sentiment accepted by the benchmark
+EOS = _text.EOS
+NEGATIONS = set(pattern_sentiment.negations)
+BANG_BOOST = 1.25  # "!" multiplies the polarity of the last assessment
+NEGATION_FACTOR = -0.5  # "not good" = slightly bad, "not bad" = slightly good
+SEPARATOR = "\x00"  # Joins the texts of a batch for tokenizing; never part of a token
+
+_replacements = list(_text.replacements.items())  # Plain substrings, despite being applied with re.sub
+_quotes = [("“", " “ "), ("”", " ” "), ("‘", " ‘ "), ("’", " ’ "), ("'", " ' "), ('"', ' " ')]
+_linebreak = re.compile(r"\n{2,}")
+_punctuation = tuple(_text.PUNCTUATION.replace(".", ""))
+_emoticons = {}
+for (_, emoticon_polarity), faces in _text.EMOTICONS.items():
+    for face in faces:
+        _emoticons.setdefault(face.lower(), emoticon_polarity)
+
+def _split_chunk(chunk):
+    """Split the punctuation off one whitespace-separated chunk, exactly as
+    textblob._text.find_tokens does."""
+    tokens, tail = [], []
+    replace = _text.replacements
+    while chunk.startswith(_punctuation) and chunk not in replace:
+        tokens.append(chunk[0])
+        chunk = chunk[1:]
+    while chunk.endswith(_punctuation + (".",)) and chunk not in replace:
+        if chunk.endswith(_punctuation):
+            tail.append(chunk[-1])
+            chunk = chunk[:-1]
+        if chunk.endswith("..."):
+            tail.append("...")
+            chunk = chunk[:-3].rstrip(".")
+        if chunk.endswith("."):
+            if (chunk in _text.ABBREVIATIONS or _text.RE_ABBR1.match(chunk) is not None
+                    or _text.RE_ABBR2.match(chunk) is not None or _text.RE_ABBR3.match(chunk) is not None):
+                break
+            tail.append(chunk[-1])
+            chunk = chunk[:-1]
+    if chunk != "":
+        tokens.append(chunk)
+    tokens.extend(reversed(tail))
+    return tokens
+
+def _tokenize_joined(text, split_chunks):
+    """Tokens of one text, or of several texts joined with SEPARATOR (every
+    rewrite below is local, so none of them crosses a separator)."""
+    for pattern, replacement in _replacements:
+        text = text.replace(pattern, replacement)
+    for quote, spaced in _quotes:
+        text = text.replace(quote, spaced)
+    text = _linebreak.sub(f" {EOS} ", text.replace("\r\n", "\n"))
+    chunks = text.split()  # str.split and \s agree on what whitespace is
+    for chunk in set(chunks).difference(split_chunks):
+        split_chunks[chunk] = " ".join(token for token in _split_chunk(chunk) if token != EOS)
+    text = " ".join(filter(None, map(split_chunks.__getitem__, chunks)))
+    text = _text.RE_SARCASM.sub("(!)", text)
+    text = _text.RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), text)
+    return text.lower()
+
+def tokenize(texts):
+    """Lower-cased tokens of every text, as TextBlob's sentiment sees them.
+    The texts are rewritten as one joined string; texts containing the
+    separator themselves are tokenized one by one."""
+    split_chunks = {SEPARATOR: SEPARATOR}
+    joined = [text for text in texts if SEPARATOR not in text]
+    tokenized = iter(_tokenize_joined(f" {SEPARATOR} ".join(joined), split_chunks).split(SEPARATOR) if joined else [])
+    return [next(tokenized).split() if SEPARATOR not in text else _tokenize_joined(text, split_chunks).split()
+            for text in texts]
+
+class Lexicon:
+    """TextBlob's sentiment lexicon as arrays. Token features are looked up
+    once per distinct token and cached by token text."""
+
+    def __init__(self):
+        "good" in pattern_sentiment  # Loads the lexicon
+        self.words = {word: pos for word, pos in dict.items(pattern_sentiment)}
+        self.modifier_tags = pattern_sentiment.modifiers
+        self.features = {}
+
+    def _features(self, token):
+        entry = self.words.get(token)
+        polarity, subjectivity, intensity = entry[None] if entry else (0.0, 0.0, 1.0)
+        return (
+            entry is not None,
+            polarity, subjectivity, intensity,
+            entry is not None and any(tag in entry for tag in self.modifier_tags),  # Known adverb
+            token.endswith("ly"),
+            token in NEGATIONS,
+            len(token),
+            len(token.strip("'")),
+            token == "!",
+            token == "(!)",
+            _emoticons.get(token, np.nan) if not token.isalpha() and len(token) <= 5 and token not in _text.PUNCTUATION else np.nan
+        )
+
+    def lookup(self, tokens):
+        """Feature arrays for a flat list of tokens."""
+        codes, uniques = pd.factorize(pd.Series(tokens, dtype=object), sort=False)
+        rows = []
+        for token in uniques:
+            if token not in self.features:
+                self.features[token] = self._features(token)
+            rows.append(self.features[token])
+        columns = list(zip(*rows)) if rows else [()] * 12
+        names = ["known", "polarity", "subjectivity", "intensity", "modifier", "ly",
+                 "negation", "length", "stripped_length", "bang", "irony", "emoticon"]
+        dtypes = [bool, float, float, float, bool, bool, bool, int, int, bool, bool, float]
+        return {name: np.array(column, dtype=dtype)[codes] for name, column, dtype in zip(names, columns, dtypes)}
+
+_lexicon = None
+
+def get_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = Lexicon()
+    return _lexicon
+
+def _previous(mask, positions):
+    """Position of the last True of `mask` strictly before every position (-1 if none)."""
+    last = np.maximum.accumulate(np.where(mask, positions, -1))
+    return np.concatenate(([-1], last[:-1]))
+
+def _between(prefix, start, end):
+    """Number of marked tokens in positions start+1 .. end-1, from a prefix count."""
+    return prefix[end] - prefix[np.maximum(start + 1, 0)]
+
+def _clamp(values):
+    return np.maximum(-1.0, np.minimum(values, 1.0))
+
+def score_texts(texts):
+    """Polarity and subjectivity arrays for a sequence (or Series) of texts."""
+    texts = [str(text) for text in texts]
+    token_lists = tokenize(texts)
+    counts = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    doc = np.repeat(np.arange(len(texts)), counts)
+    positions = np.arange(len(doc))
+    if len(doc) == 0:
+        return np.zeros(len(texts)), np.zeros(len(texts))
+    doc_start = (np.cumsum(counts) - counts)[doc]
+    f = get_lexicon().lookup([token for tokens in token_lists for token in tokens])
+
+    def prefix(mask):
+        return np.concatenate(([0], np.cumsum(mask)))
+
+    known = f["known"]
+    negation = ~known & f["negation"]
+    other = ~known & ~negation
+    clears_modifier = prefix(other & (f["length"] > 2))
+    clears_negation = prefix(other & (f["stripped_length"] > 1))
+    negation_clears_modifier = prefix(negation & (f["length"] > 2))
+
+    # Is a modifier ("very", "really") in effect at each token?
+    last_known = _previous(known, positions)
+    has_known = last_known >= doc_start
+    safe_known = np.where(has_known, last_known, 0)
+    modifier_live = (has_known & f["modifier"][safe_known]
+                     & (_between(clears_modifier, last_known, positions) == 0)
+                     & (f["ly"][safe_known] | (_between(negation_clears_modifier, last_known, positions) == 0)))
+    # A negation right after an "-ly" modifier negates the modifier's assessment ("really not good")
+    attaches = negation & modifier_live & f["ly"][safe_known]
+
+    # Is a negation in effect at each token?
+    last_negation = _previous(negation, positions)
+    safe_negation = np.maximum(last_negation, 0)
+    negation_live = ((last_negation >= doc_start) & (last_negation > last_known)
+                     & (_between(clears_negation, last_negation, positions) == 0)
+                     & ~attaches[safe_negation])
+
+    # Assessments: started by a known word outside a modifier, an emoticon or "(!)";
+    # a known word right after a modifier is merged into the latest assessment
+    emoticon = other & ~np.isnan(f["emoticon"])
+    irony = other & f["irony"]
+    starts = (known & ~modifier_live) | emoticon | irony
+    assessment = np.cumsum(starts) - 1
+    has_assessment = np.cumsum(starts) > prefix(starts)[doc_start]
+    n_assessments = int(starts.sum())
+
+    members = np.flatnonzero(known | emoticon | irony)
+    member_assessment = assessment[members]
+    member_polarity = np.where(known, f["polarity"], np.where(emoticon, np.nan_to_num(f["emoticon"]), 0.0))[members]
+    member_subjectivity = np.where(known, f["subjectivity"], 1.0)[members]
+    member_intensity = np.where(known, np.where(negation_live, 1.0 / f["intensity"], f["intensity"]), 1.0)[members]
+
+    is_last = np.ones(len(members), dtype=bool)
+    is_last[:-1] = member_assessment[1:] != member_assessment[:-1]
+    has_previous = np.zeros(len(members), dtype=bool)
+    has_previous[1:] = member_assessment[1:] == member_assessment[:-1]
+    previous_intensity = np.concatenate(([1.0], member_intensity[:-1]))
+
+    last = is_last
+    polarity = np.where(has_previous[last], _clamp(member_polarity[last] * previous_intensity[last]), member_polarity[last])
+    subjectivity = np.where(has_previous[last], _clamp(member_subjectivity[last] * previous_intensity[last]), member_subjectivity[last])
+    last_member = members[last]
+
+    # "!" boosts the latest assessment, unless a later merge overwrites its polarity
+    bangs = other & f["bang"] & has_assessment
+    bang_target = assessment[bangs]
+    counted = positions[bangs] > last_member[bang_target]
+    boosts = np.bincount(bang_target[counted], minlength=n_assessments)
+    for step in range(1, int(boosts.max(initial=0)) + 1):
+        polarity = np.where(boosts >= step, _clamp(polarity * BANG_BOOST), polarity)
+
+    negated = np.zeros(n_assessments, dtype=bool)
+    negated[assessment[known & negation_live]] = True
+    negated[assessment[attaches]] = True
+    polarity = np.where(negated, polarity * NEGATION_FACTOR, polarity)
+
+    # Average the assessments of every text (0.0 for a text without any)
+    assessment_doc = doc[starts]
+    totals = np.bincount(assessment_doc, minlength=len(texts)).astype(float)
+    divisor = np.where(totals > 0, totals, 1.0)
+    return (np.bincount(assessment_doc, weights=polarity, minlength=len(texts)) / divisor,
+            np.bincount(assessment_doc, weights=subjectivity, minlength=len(texts)) / divisor)
+
+def batch_scores(texts):
+    """(polarity, subjectivity) pairs, the scorer interface of sentiment_cache."""
+    polarity, subjectivity = score_texts(texts)
+    return list(zip(polarity.tolist(), subjectivity.tolist()))
+
+def benchmark(data_dir, sample=None):
+    """Compare score_texts with TextBlob on the scraped comments."""
+    from comment_benchmark import print_timings, sample_comments, timed
+
+    comments = sample_comments(data_dir, sample)
+    reference, textblob_time = timed(lambda: [TextBlob(comment).sentiment for comment in comments])
+    (polarity, subjectivity), batch_time = timed(score_texts, comments)
+
+    polarity_diff = np.abs(polarity - np.array([score.polarity for score in reference]))
+    subjectivity_diff = np.abs(subjectivity - np.array([score.subjectivity for score in reference]))
+    within = (polarity_diff <= TOLERANCE) & (subjectivity_diff <= TOLERANCE)
+    print_timings(len(comments), {"TextBlob .apply": textblob_time, "batch_polarity": batch_time})
+    print(f"Within {TOLERANCE:g} of TextBlob: {within.mean():.4%} "
+          f"(max difference: polarity {polarity_diff.max():.3g}, subjectivity {subjectivity_diff.max():.3g})")
+    for comment in comments[~within][:5]:
+        print(f"\tdiffers: {comment[:100]!r}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batch polarity against TextBlob.")
+    parser.add_argument("--data-dir", default="../data")
+    parser.add_argument("--sample", type=int, default=20000, help="Number of comments compared (0 = all)")
+    args = parser.parse_args()
+    benchmark(args.data_dir, args.sample)
@@ -0,0 +1,112 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+import pandas as pd
+import checkpoints
+import clients
+import game_scraper
+import youtube_quota
+from metacritic_parser import parse_reviews
+from replay_server import FIXTURE_DIR, FixtureStore, start_server
+
+# Upstreams each scraper talks to (Reddit also fetches its OAuth token)
+PLATFORM_UPSTREAMS = {
+    "reddit": ["reddit", "reddit-www"],
+    "youtube": ["youtube"],
+    "steam": ["steam"]
+}
+# Metacritic is scraped through Chrome, and the replay server only sees the
+# top-level page: the page's own assets and its review (infinite scroll) XHRs
+# go to their absolute URLs, i.e. 404s or the live site. So Metacritic is timed
+# on the pages saved with METACRITIC_HTML_DIR instead (parsing only, no browser).
+METACRITIC_HTML = "metacritic_html"
+PLATFORMS = list(PLATFORM_UPSTREAMS) + ["metacritic"]
+
+def count_comments(directory):
+    """Number of rows written to all comment CSVs below `directory`."""
+    return sum(len(pd.read_csv(path)) for path in glob.glob(f"{directory}/*/*.csv"))
+
+def benchmark_platform(server, platform, limits):
+    """Run one scraper over every game against the replay server."""
+    before = server.snapshot()
+    with tempfile.TemporaryDirectory() as out_dir:
+        checkpoints.CHECKPOINT_FILE = os.path.join(out_dir, "checkpoints.json")
+        youtube_quota.PLAN_FILE = os.path.join(out_dir, "youtube_plan.json")
+        youtube_quota._planner = None  # Fresh quota and video plan for every run
+        start = time.perf_counter()
+        game_scraper.run_scraper([platform], limits, data_dir=out_dir)
+        elapsed = time.perf_counter() - start
+        comments = count_comments(out_dir)
+    after = server.snapshot()
+    delta = {
+        field: sum(after[u][field] - before[u][field] for u in PLATFORM_UPSTREAMS[platform])
+        for field in ("requests", "throttled", "missing")
+    }
+    return {
+        "platform": platform,
+        "pages": delta["requests"],
+        "comments": comments,
+        "wall_s": round(elapsed, 2),
+        "pages/s": round(delta["requests"] / elapsed, 1),
+        "comments/s": round(comments / elapsed, 1),
+        "throttled": delta["throttled"],
+        "missing": delta["missing"]
+    }
+
+def benchmark_metacritic(fixture_dir):
+    """Parse every saved Metacritic page with parse_reviews."""
+    paths = sorted(glob.glob(os.path.join(fixture_dir, METACRITIC_HTML, "*.html")))
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    start = time.perf_counter()
+    comments = sum(len(parse_reviews(html)) for html in pages)
+    elapsed = time.perf_counter() - start
+    return {
+        "platform": "metacritic (parse only)",
+        "pages": len(pages),
+        "comments": comments,
+        "wall_s": round(elapsed, 2),
+        "pages/s": round(len(pages) / elapsed, 1) if elapsed else None,
+        "comments/s": round(comments / elapsed, 1) if elapsed else None,
+        "throttled": 0,
+        "missing": 0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the scrapers offline against recorded fixtures.")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Fixture directory recorded with replay_server.py")
+    parser.add_argument("--platforms", nargs="+", default=PLATFORMS, choices=PLATFORMS)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay, 0..jitter seconds")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests/sec per upstream before answering 429")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=None, help="Override the job concurrency of every platform")
+    args = parser.parse_args()
+
+    server = start_server(FixtureStore(args.fixtures), "replay", latency=args.latency, jitter=args.jitter,
+                          rate_limit=args.rate_limit, burst=args.burst)
+    os.environ["SCRAPER_PROXY_URL"] = f"http://127.0.0.1:{server.server_port}"
+    # The replay server ignores credentials, but the clients refuse to start without them
+    for name, value in clients.REDDIT_CREDENTIALS.items():
+        clients.REDDIT_CREDENTIALS[name] = value or "replay"
+    clients.YOUTUBE_API_KEY = clients.YOUTUBE_API_KEY or "replay"
+
+    limits = None
+    if args.concurrency:
+        limits = {platform: {"concurrency": args.concurrency} for platform in args.platforms}
+    results = [benchmark_platform(server, platform, limits) for platform in args.platforms if platform != "metacritic"]
+    server.shutdown()
+    if "metacritic" in args.platforms:
+        results.append(benchmark_metacritic(args.fixtures))
+
+    print(pd.DataFrame(results).to_string(index=False))
+    if "metacritic" in args.platforms:
+        print(f"Metacritic: only the parsing of the pages saved in {os.path.join(args.fixtures, METACRITIC_HTML)} "
+              "is timed; page loads and scrolling in Chrome cannot be replayed offline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from webdriver_manager.chrome import ChromeDriverManager
+from scrape_engine import PLATFORM_LIMITS
+
+POOL_SIZE = PLATFORM_LIMITS["metacritic"]["concurrency"]  # Default number of headless browsers kept alive
+PAGES_PER_DRIVER = 25  # Restart a browser after this many pages to keep memory in check
+LOAD_TIMEOUT = 10  # Seconds to wait for the first reviews of a page
+SCROLL_TIMEOUT = 3  # Seconds to wait for more reviews after each scroll
+POLL_INTERVAL = 0.25  # Seconds between checks while waiting
+
+class BrowserPool:
+    """Starts headless Chrome drivers once and leases them to scraping jobs.
+    A driver is quit and replaced after `pages_per_driver` pages."""
+
+    def __init__(self, size=POOL_SIZE, pages_per_driver=PAGES_PER_DRIVER):
+        self.size = size
+        self.pages_per_driver = pages_per_driver
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = 0
+        self.service_path = None  # ChromeDriverManager().install() runs only once
+
+    def _start_driver(self):
+        """Start one headless Chrome."""
+        with self.lock:
+            if self.service_path is None:
+                self.service_path = ChromeDriverManager().install()
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        driver = webdriver.Chrome(service=Service(self.service_path), options=options)
+        driver.pages_served = 0
+        return driver
+
+    def _acquire(self):
+        """Take an idle driver, or start a new one while below `size`,
+        otherwise wait until a driver is released or a slot is freed."""
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                can_start = self.started < self.size
+                if can_start:
+                    self.started += 1
+            if can_start:
+                try:
+                    return self._start_driver()
+                except Exception:
+                    with self.lock:
+                        self.started -= 1
+                    raise
+            try:
+                return self.idle.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def _discard(self, driver):
+        """Quit a driver and free its slot in the pool."""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self.lock:
+            self.started -= 1
+
+    @contextmanager
+    def lease(self):
+        """Lease a driver for one page. Drivers that raised an error or reached
+        their page limit are recycled instead of going back to the pool."""
+        driver = self._acquire()
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            driver.pages_served += 1
+            with self.lock:
+                oversized = self.started > self.size  # The pool was made smaller
+            if failed or oversized or driver.pages_served >= self.pages_per_driver:
+                self._discard(driver)
+            else:
+                self.idle.put(driver)
+
+    def close(self):
+        """Quit every idle driver."""
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+def wait_for_count(driver, css_selector, previous=0, timeout=SCROLL_TIMEOUT):
+    """Wait until more than `previous` elements match `css_selector`.
+    Returns the new count, or the current count once `timeout` passes."""
+    count_script = f"return document.querySelectorAll({css_selector!r}).length"
+
+    def grown(d):
+        count = d.execute_script(count_script)
+        return count if count > previous else False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(grown)
+    except TimeoutException:
+        return driver.execute_script(count_script)
+
+def scroll_until_stable(driver, css_selector, timeout=SCROLL_TIMEOUT):
+    """Scroll to the bottom until the number of `css_selector` elements stops
+    growing, waiting on the page itself instead of a fixed sleep."""
+    count = wait_for_count(driver, css_selector, timeout=LOAD_TIMEOUT)
+    while True:
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        new_count = wait_for_count(driver, css_selector, previous=count, timeout=timeout)
+        if new_count <= count:
+            return count  # No new reviews loaded
+        count = new_count
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool(size=None):
+    """Return the process-wide browser pool. `size` sets how many browsers it
+    keeps (run_scraper passes the Metacritic concurrency in use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(size or POOL_SIZE)
+            atexit.register(_pool.close)
+        elif size:
+            with _pool.lock:
+                _pool.size = size
+        return _pool
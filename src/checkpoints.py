@@ -0,0 +1,46 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+# One JSON file holds the crawl state of every (source, genre, game) job (a game
+# listed under two genres is crawled into two files, so it has two checkpoints):
+#   cursor / page_token: where an interrupted crawl has to resume
+#   since:               watermark of the crawl in progress (stop at older rows)
+#   newest_timestamp:    newest comment written so far (unix seconds)
+#   newest_date:         same, as a 'commented_date' string
+CHECKPOINT_FILE = "../data/.checkpoints.json"
+
+_lock = threading.Lock()  # scrapers run in parallel threads
+
+def _read(path):
+    """Read the whole checkpoint file (empty if it does not exist yet)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _key(source, genre, game):
+    return f"{source}:{genre}:{game}"
+
+def load_checkpoint(source, genre, game, path=None):
+    """Return the stored checkpoint for a (source, genre, game) job, or an empty dict."""
+    path = path or CHECKPOINT_FILE
+    with _lock:
+        return _read(path).get(_key(source, genre, game), {})
+
+def save_checkpoint(source, genre, game, checkpoint, path=None):
+    """Store the checkpoint of a (source, genre, game) job. The file is replaced
+    atomically so a crash while saving never corrupts earlier checkpoints."""
+    path = path or CHECKPOINT_FILE
+    with _lock:
+        checkpoints = _read(path)
+        checkpoints[_key(source, genre, game)] = checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoints, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+def timestamp_to_date(timestamp):
+    """Format a unix timestamp the same way as the 'commented_date' column."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d')
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_DIR = "../data/.clean_cache"
+CACHE_VERSION = 2  # Bump when the cleaning steps change, to throw every cached result away
+HASH_CHUNK = 1 << 20
+
+def file_hash(file_path):
+    """SHA-1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_atomic(path, data):
+    """Write bytes to `path` through a temporary file, so a crash never leaves half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class RowCache:
+    """Per-comment results keyed by comment hash: (is English, sentiment label or None).
+    Entries added since the last `take_added` are kept apart so worker
+    processes can send them back to the main process."""
+
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else {}
+        self.added = {}
+
+    def get(self, key):
+        return self.rows.get(key)
+
+    def add(self, key, entry):
+        self.rows[key] = entry
+        self.added[key] = entry
+        return entry
+
+    def take_added(self):
+        """Return and forget the entries added since the last call."""
+        added, self.added = self.added, {}
+        return added
+
+def _rows_path(cache_dir):
+    return os.path.join(cache_dir, "rows.pkl")
+
+def _load_rows(cache_dir):
+    path = _rows_path(cache_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                version, rows = pickle.load(f)
+            if version == CACHE_VERSION:
+                return rows
+        except Exception as e:
+            print(f"Ignoring unreadable row cache {path}: {e}")
+    return {}
+
+_row_caches = {}
+
+def get_row_cache(cache_dir=None):
+    """Return this process's row cache for `cache_dir`, read from disk on first use."""
+    cache_dir = cache_dir or CACHE_DIR
+    if cache_dir not in _row_caches:
+        _row_caches[cache_dir] = RowCache(_load_rows(cache_dir))
+    return _row_caches[cache_dir]
+
+class CleanCache:
+    """Cleaning results of earlier runs, kept under `cache_dir`:
+    manifest.json  source file -> key of its cleaned frame (path, content hash + settings)
+    frames/        one pickled frame per cleaned source file
+    rows.pkl       the row cache (see RowCache)
+
+    `settings` is any text describing the cleaning rules (e.g. the release
+    dates); frames cleaned under other settings are not reused."""
+
+    def __init__(self, cache_dir=None, settings=""):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.settings = settings
+        self.frames_dir = os.path.join(self.cache_dir, "frames")
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        os.makedirs(self.frames_dir, exist_ok=True)
+        self.manifest = {"version": CACHE_VERSION, "files": {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CACHE_VERSION:
+                self.manifest = manifest
+        self.rows = get_row_cache(self.cache_dir)
+        self.keys = {}  # Source file -> frame key computed in this run
+
+    def _frame_key(self, file_path):
+        if file_path not in self.keys:
+            # The path is part of the key: source, genre and game come from the file's name and folder,
+            # so two files with the same content must not share a frame
+            relative_path = os.path.relpath(file_path, os.path.dirname(os.path.abspath(self.cache_dir)))
+            digest = hashlib.sha1(f"{relative_path}:{file_hash(file_path)}:{self.settings}".encode("utf-8"))
+            self.keys[file_path] = digest.hexdigest()
+        return self.keys[file_path]
+
+    def _frame_path(self, key):
+        return os.path.join(self.frames_dir, f"{key}.pkl")
+
+    def load_frame(self, file_path):
+        """The cleaned frame of an unchanged file, or None if it must be processed."""
+        key = self._frame_key(file_path)
+        if self.manifest["files"].get(file_path) != key or not os.path.exists(self._frame_path(key)):
+            return None
+        try:
+            with open(self._frame_path(key), "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable cached frame of {file_path}: {e}")
+            return None
+
+    def store_frame(self, file_path, df):
+        """Remember the cleaned frame of a source file."""
+        key = self._frame_key(file_path)
+        _write_atomic(self._frame_path(key), pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+        self.manifest["files"][file_path] = key
+
+    def save(self, file_paths=None):
+        """Write the manifest and row cache. Files not in `file_paths` (if given)
+        are dropped from the manifest and their frames deleted."""
+        if file_paths is not None:
+            keep = set(file_paths)
+            self.manifest["files"] = {path: key for path, key in self.manifest["files"].items() if path in keep}
+        used = {f"{key}.pkl" for key in self.manifest["files"].values()}
+        for name in os.listdir(self.frames_dir):
+            if name not in used:
+                os.remove(os.path.join(self.frames_dir, name))
+        _write_atomic(self.manifest_path, json.dumps(self.manifest, indent=2, sort_keys=True).encode("utf-8"))
+        _write_atomic(_rows_path(self.cache_dir), pickle.dumps((CACHE_VERSION, self.rows.rows), protocol=pickle.HIGHEST_PROTOCOL))
+        self.rows.take_added()
@@ -1,11 +1,16 @@
+import argparse
 import os
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 import re
+import numpy as np
 from datetime import datetime
-from textblob import TextBlob
-from langdetect import detect, DetectorFactory
-
-DetectorFactory.seed = 0  # Ensure consistent language detection
+import clean_cache
+import dataset_store
+import language_filter
+import near_duplicates
+import sentiment_cache
 
 # Define game release dates
 RELEASE_DATES = {
@@ -51,29 +56,93 @@ def is_valid_comment(comment):
 
 def is_english(comment):
     """Detects if the comment is in English."""
-    return detect(comment) == 'en'
+    return language_filter.is_english(comment)
+
+def valid_text_mask(comments):
+    """The checks of is_valid_comment except the language, for a whole Series at once."""
+    is_text = comments.map(lambda comment: isinstance(comment, str))
+    text = comments.where(is_text, "").astype(str)
+    invalid = text.str.lower().str.contains("|".join(re.escape(pattern) for pattern in INVALID_PATTERNS))
+    starts_with_letter = text.str.strip().str.match(r'[A-Za-z]')
+    return is_text & ~invalid & starts_with_letter
+
+def valid_comment_mask(comments):
+    """Same result as applying is_valid_comment to every comment, but the cheap
+    checks run column-wise and only the comments that pass them reach the
+    (tiered) language check."""
+    mask = valid_text_mask(comments)
+    mask[mask.to_numpy()] = language_filter.english_mask(comments[mask]).to_numpy()
+    return mask
 
-def process_csv(file_path, all_data):
-    """Process a single CSV file by filtering and adding the "commented" and sentiment columns."""
+def process_csv(file_path, all_data=None, row_cache=None):
+    """Process a single CSV file by filtering and adding the "commented" and sentiment columns.
+    Returns the processed frame (None if the file was skipped) and appends it to `all_data` if given.
+    With a RowCache, comments classified in an earlier run are not classified again."""
     try:
         df = pd.read_csv(file_path)
         # Ensure required columns exist
         if not {'genre', 'game', 'commented_date', 'comment'}.issubset(df.columns):
             print(f"Skipping {file_path}: Missing required columns.")
-            return
-        # Filter comments
-        df = df[df['comment'].apply(is_valid_comment)]
+            return None
+        # Filter comments (cheap checks first, the language check only on what is left)
+        df = df[valid_text_mask(df['comment'])]
         # Convert comment column to string
         df['comment'] = df['comment'].astype(str)
-        # Add 'commented' column
-        if 'commented_date' in df.columns and 'game' in df.columns:
-            df['commented'] = df.apply(lambda row: calculate_days_since_release(row['game'], row['commented_date']), axis=1)
+        # Add 'source' column (platform from the file name)
+        df['source'] = dataset_store.source_of(file_path)
+        english, sentiment = classify_comments(df['comment'], row_cache)
+        df = df[english]
+        # Add typed 'commented_date', 'days_since_release' and 'commented' columns
+        df = add_release_columns(df)
         # Add 'comment_sentiment' column (renamed from 'polarity')
-        df['comment_sentiment'] = df['comment'].apply(calculate_sentiment)
+        df['comment_sentiment'] = sentiment[df.index]
+        # Keep the dataset's columns only: raw extras (Reddit's own 'platform', 'release_period') are dropped
+        df = df[dataset_store.COMMENT_COLUMNS]
         # Append to all_data
-        all_data.append(df)
+        if all_data is not None:
+            all_data.append(df)
+        return df
     except Exception as e: # In case csv somehow doesn't have columns
         print(f"Error processing {file_path}: {e}")
+        return None
+
+def classify_comments(comments, row_cache=None):
+    """Language and sentiment of every comment: returns the English mask and the
+    sentiment labels of the English comments. Results are looked up in / added
+    to `row_cache` by comment hash, so only unseen comments are classified."""
+    if row_cache is None:
+        row_cache = clean_cache.RowCache()
+    hashes = comments.map(language_filter.comment_hash).to_numpy()
+    entries = [row_cache.get(key) for key in hashes]
+    new = np.array([entry is None for entry in entries], dtype=bool)
+    if new.any():
+        new_comments = comments[new]
+        english = language_filter.english_mask(new_comments).to_numpy()
+        labels = np.full(len(new_comments), None, dtype=object)
+        labels[english] = sentiment_labels(sentiment_cache.get_cache().scores(new_comments[english])[0])
+        for position, key, is_english_comment, label in zip(np.flatnonzero(new), hashes[new], english, labels):
+            entries[position] = row_cache.add(key, (bool(is_english_comment), label))
+    english = pd.Series([entry[0] for entry in entries], index=comments.index, dtype=bool)
+    sentiment = pd.Series([entry[1] for entry in entries], index=comments.index, dtype=object)[english]
+    return english, sentiment
+
+def add_release_columns(df):
+    """Join the release dates onto the frame once and add, column-wise:
+    'commented_date' as datetime64, 'days_since_release' (int, negative before
+    release) and the 'commented' label ("before" / "after").
+    Game names are matched case-insensitively; rows with an unknown game or an
+    unreadable date are dropped."""
+    release_dates = {game.lower(): date for game, date in RELEASE_DATES.items()}
+    release = pd.to_datetime(df['game'].astype(str).str.lower().map(release_dates), format="%Y-%m-%d")
+    commented_date = pd.to_datetime(df['commented_date'], format="%Y-%m-%d", errors='coerce')
+    known = release.notna() & commented_date.notna()
+    if not known.all():
+        print(f"Dropping {int((~known).sum())} rows with an unknown game or date")
+    df = df[known].copy()
+    df['commented_date'] = commented_date[known]
+    df['days_since_release'] = (commented_date[known] - release[known]).dt.days.astype('int32')
+    df['commented'] = np.where(df['days_since_release'] < 0, "before", "after")
+    return df
 
 def calculate_days_since_release(game, commented_date):
     """Determine if the comment was made before or after the game's release."""
@@ -83,33 +152,108 @@ def calculate_days_since_release(game, commented_date):
     return "before" if comment_date < release_date else "after"
 
 def calculate_sentiment(comment):
-    """Calculate the sentiment of a comment using NLP."""
-    sentiment = TextBlob(comment).sentiment.polarity
+    """Calculate the sentiment of a comment using NLP (scores come from the shared sentiment cache)."""
+    sentiment = sentiment_cache.get_cache().score(comment)[0]
     if sentiment > 0:
         return "positive"
     elif sentiment < 0:
         return "negative"
     else:
         return "neutral"
+
+def sentiment_labels(polarity):
+    """calculate_sentiment's labels for an array of polarities."""
+    return np.where(polarity > 0, "positive", np.where(polarity < 0, "negative", "neutral"))
     
-def main():
-    """Iterate through each CSV file in subfolders and process them."""
-    data_dir = "../data"  # Root data folder
-    all_data = []
-    for genre_folder in os.listdir(data_dir):
+def list_csv_files(data_dir):
+    """All CSV files in the genre subfolders of `data_dir`, in a fixed order."""
+    file_paths = []
+    for genre_folder in sorted(os.listdir(data_dir)):
         genre_path = os.path.join(data_dir, genre_folder)
         
         if os.path.isdir(genre_path):
-            for file in os.listdir(genre_path):
+            for file in sorted(os.listdir(genre_path)):
                 if file.endswith(".csv"):
-                    file_path = os.path.join(genre_path, file)
-                    process_csv(file_path, all_data)
+                    file_paths.append(os.path.join(genre_path, file))
+    return file_paths
+
+def _process_cached(file_path, cache_dir):
+    """Process a file against this process's copy of the row cache and return
+    the frame together with the row cache entries it added."""
+    row_cache = clean_cache.get_row_cache(cache_dir)
+    row_cache.take_added()
+    df = process_csv(file_path, row_cache=row_cache)
+    return df, row_cache.take_added()
+
+def cache_settings():
+    """The cleaning rules a cached frame depends on."""
+    return repr((sorted(RELEASE_DATES.items()), INVALID_PATTERNS, dataset_store.COMMENT_COLUMNS))
+
+def process_files(file_paths, workers=1, cache=None):
+    """Run process_csv over every file, on a process pool if `workers` > 1.
+    Results come back in the order of `file_paths`, so the output matches a serial run.
+    With a CleanCache, unchanged files come straight from the cache and changed
+    files only classify the comments not seen before."""
+    results = [None] * len(file_paths)
+    if cache is not None:
+        results = [cache.load_frame(file_path) for file_path in file_paths]
+    todo = [i for i, df in enumerate(results) if df is None]
+    if cache is not None:
+        print(f"{len(file_paths) - len(todo)} files unchanged, {len(todo)} to process")
+    task = process_csv if cache is None else partial(_process_cached, cache_dir=cache.cache_dir)
+
+    def finish(i, outcome):
+        if cache is None:
+            results[i] = outcome
+            return
+        results[i], added = outcome
+        cache.rows.rows.update(added)  # No-op in a serial run, where the row cache is shared
+        if results[i] is not None:
+            cache.store_frame(file_paths[i], results[i])
+
+    if workers <= 1:
+        for i in todo:
+            finish(i, task(file_paths[i]))
+        return results
+    # Largest files first, so one big file (e.g. a Reddit dump) never starts last
+    by_size = sorted(todo, key=lambda i: os.path.getsize(file_paths[i]), reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(task, file_paths[i]): i for i in by_size}
+        for done, future in enumerate(as_completed(futures), start=1):
+            finish(futures[future], future.result())
+            print(f"Processed {done}/{len(todo)}: {file_paths[futures[future]]}")
+    return results
+
+def main():
+    """Iterate through each CSV file in subfolders and process them."""
+    parser = argparse.ArgumentParser(description="Clean the scraped comments into one dataset.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to clean files in parallel")
+    parser.add_argument("--no-cache", action="store_true", help="Clean every file from scratch and leave the cache alone")
+    parser.add_argument("--near-duplicates", type=float, nargs="?", const=near_duplicates.THRESHOLD, default=None,
+                        metavar="THRESHOLD", help="Also drop near-duplicate comments (similarity 0-1, default %(const)s)")
+    args = parser.parse_args()
+
+    data_dir = "../data"  # Root data folder
+    file_paths = list_csv_files(data_dir)
+    cache = None if args.no_cache else clean_cache.CleanCache(settings=cache_settings())
+    all_data = [df for df in process_files(file_paths, args.workers, cache) if df is not None]
+    if cache is not None:
+        cache.save(file_paths)
+    print(sentiment_cache.get_cache().report())
     
     # Combine all datasets
     final_df = pd.concat(all_data, ignore_index=True)
     
     # Remove duplicate rows based on 'comment' column (or other unique identifiers)
     final_df = final_df.drop_duplicates(subset=['comment'], keep='first')
+
+    # Optionally remove near duplicates too (copy-pasta, reposts, spam with small edits)
+    if args.near_duplicates is not None:
+        before_count = len(final_df)
+        final_df, clusters = near_duplicates.drop_near_duplicates(final_df, threshold=args.near_duplicates)
+        clusters.to_csv("../data/near_duplicate_clusters.csv", index=False)
+        print(f"Dropped {before_count - len(final_df)} near duplicates in {len(clusters)} clusters "
+              f"(see 'data/near_duplicate_clusters.csv')")
     
     # Reduce "after" comments by half, keeping longer ones
     after_df = final_df[final_df['commented'] == 'after']
@@ -120,9 +264,7 @@ def main():
     final_df = pd.concat([final_df[final_df['commented'] == 'before'], after_df], ignore_index=True)
     
     # Save the final dataset with 'comment_sentiment' and no duplicates
-    final_df.to_csv("../data/final_comment_dataset.csv", index=False)
-    
-    print("Dataset saved as 'data/final_comment_dataset.csv'")
+    dataset_store.write_dataset(final_df, "comments")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
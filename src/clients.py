@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+import praw
+import requests
+from requests.adapters import HTTPAdapter
+from googleapiclient.discovery import build
+from dotenv import load_dotenv
+
+load_dotenv() # load keys
+
+# KEYS
+REDDIT_CREDENTIALS = { # Get Reddit credentials
+    "client_id": os.getenv("REDDIT_CLIENT_ID"),
+    "client_secret": os.getenv("REDDIT_CLIENT_SECRET"),
+    "user_agent": os.getenv("REDDIT_USER_AGENT")
+}
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")  # Get Youtube credential
+
+# Upstream hosts. With SCRAPER_PROXY_URL set, every request goes through the
+# local record/replay server instead (see replay_server.py)
+UPSTREAMS = {
+    "steam": "https://store.steampowered.com",
+    "youtube": "https://youtube.googleapis.com",
+    "reddit": "https://oauth.reddit.com",
+    "reddit-www": "https://www.reddit.com",
+    "metacritic": "https://www.metacritic.com"
+}
+
+VALIDATION_TTL = 3600  # Seconds a credential check stays valid
+STEAM_POOL_SIZE = 8  # Keep-alive connections kept open to the Steam store
+
+_local = threading.local()  # praw and googleapiclient clients are not thread-safe
+_lock = threading.Lock()
+_validation_locks = {"reddit": threading.Lock(), "youtube": threading.Lock()}
+_validated = {}  # source -> (is_valid, checked_at)
+_steam_session = None
+
+def endpoint(name):
+    """Base URL of an upstream, routed through the replay server if configured."""
+    proxy = os.getenv("SCRAPER_PROXY_URL")
+    return f"{proxy.rstrip('/')}/{name}" if proxy else UPSTREAMS[name]
+
+# CLIENTS
+def get_reddit():
+    """Return the Reddit client of the calling thread, created on first use
+    and reused for every game scraped by that thread afterwards."""
+    if not hasattr(_local, "reddit"):
+        _local.reddit = praw.Reddit(
+            **REDDIT_CREDENTIALS,
+            oauth_url=endpoint("reddit"),
+            reddit_url=endpoint("reddit-www")
+        )
+    return _local.reddit
+
+def get_youtube():
+    """Return the YouTube service of the calling thread. The service is built
+    once per thread (without re-fetching the discovery document) and reused."""
+    if not hasattr(_local, "youtube"):
+        _local.youtube = build(
+            "youtube", "v3",
+            developerKey=YOUTUBE_API_KEY,
+            cache_discovery=False,
+            client_options={"api_endpoint": f"{endpoint('youtube')}/youtube/v3/"}
+        )
+    return _local.youtube
+
+def get_steam_session():
+    """Return the process-wide Steam session, which keeps a pool of
+    keep-alive connections shared by every Steam job."""
+    global _steam_session
+    with _lock:
+        if _steam_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=STEAM_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _steam_session = session
+        return _steam_session
+
+# VALIDATION FUNCTIONS
+def _check_reddit():
+    get_reddit().user.me()
+
+def _check_youtube():
+    get_youtube().videos().list(part="id", id="test").execute()  # 1 quota unit instead of 100 for a search
+
+_CHECKS = {"reddit": ("Reddit", _check_reddit), "youtube": ("YouTube", _check_youtube)}
+
+def validate(source, ttl=VALIDATION_TTL):
+    """Check the credentials of a source once and cache the answer for `ttl`
+    seconds, so parallel jobs do not each make a live API round trip."""
+    with _validation_locks[source]:
+        cached = _validated.get(source)
+        if cached and time.monotonic() - cached[1] < ttl:
+            return cached[0]
+        name, check = _CHECKS[source]
+        try:
+            check()
+            is_valid = True
+        except Exception as e:
+            print(f"{name} API error: {e}")
+            is_valid = False
+        _validated[source] = (is_valid, time.monotonic())
+        return is_valid
@@ -0,0 +1,35 @@
+import time
+import pandas as pd
+from language_filter import load_comments
+
+# Shared parts of the benchmark CLIs of the comment-processing modules
+# (batch_polarity, aspect_matcher, feature_tagger, language_filter): every
+# benchmark runs on the same comments and sample and prints the same table.
+
+def sample_comments(data_dir, sample=None):
+    """The comments that reach the language check in clean_data
+    (language_filter.load_comments), or a fixed random sample of them."""
+    comments = load_comments(data_dir)
+    if sample and sample < len(comments):
+        comments = comments.sample(sample, random_state=0).reset_index(drop=True)
+    print(f"{len(comments)} comments from {data_dir}")
+    return comments
+
+def timed(function, *args):
+    """(result, seconds) of function(*args)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def print_timings(count, timings, **columns):
+    """Print seconds and comments/s of every method ({method: seconds}, the old
+    one first) and the speedup of the last one. Extra `columns` hold one value
+    per method."""
+    rows = [{"method": method, "seconds": round(seconds, 2), "comments/s": round(count / seconds, 1) if seconds else None}
+            for method, seconds in timings.items()]
+    for name, values in columns.items():
+        for row, value in zip(rows, values):
+            row[name] = value
+    print(pd.DataFrame(rows).to_string(index=False))
+    first, last = list(timings.values())[0], list(timings.values())[-1]
+    print(f"Speedup: {first / last:.1f}x")
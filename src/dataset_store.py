@@ -0,0 +1,224 @@
+import argparse
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STORE_DIR = "../data/store"
+PARTITION_COLUMNS = ["genre", "game", "source"]
+
+# Datasets written by the pipeline stages
+DATASETS = {
+    "comments": "cleaned comments (clean_data.py)",
+    "reviews": "comments with aspect sentiments (aspect_analysis.py)",
+    "enhanced": "reviews with polarity, subjectivity and feature flags (postprocess.py)"
+}
+
+SENTIMENTS = ["negative", "neutral", "positive"]
+ASPECT_COLUMNS = [
+    "cost", "graphics", "platform", "storyline", "gameplay",
+    "soundtrack", "difficulty", "collaboration", "performance", "replayability"
+]
+COMMENT_COLUMNS = [
+    "genre", "game", "source", "commented_date", "days_since_release",
+    "commented", "comment_sentiment", "comment"
+]
+EMOTION_COLUMNS = ["emotion", "emotion_score"]
+# Columns a dataset may hold; any other column is dropped when it is written.
+# Scraped files can bring their own columns (Reddit's 'platform' would be taken
+# for the platform aspect). 'enhanced' is open: its flags follow the feature patterns.
+SCHEMAS = {
+    "comments": COMMENT_COLUMNS,
+    "reviews": COMMENT_COLUMNS + EMOTION_COLUMNS + ASPECT_COLUMNS
+}
+
+# Low-cardinality text columns are stored as categoricals with a fixed set of
+# values (one small integer code per row instead of a string)
+CATEGORIES = {
+    "commented": ["before", "after"],
+    "comment_sentiment": SENTIMENTS
+}
+# The aspect columns together form a reviews x aspects int8 matrix, one code per cell:
+#   0 = none (aspect not mentioned), 1 = negative, 2 = neutral, 3 = positive
+ASPECT_LABELS = ["none"] + SENTIMENTS
+ASPECT_CODES = {label: code for code, label in enumerate(ASPECT_LABELS)}
+COLUMN_TYPES = {
+    "days_since_release": "int32",
+    "polarity": "float32",
+    "subjectivity": "float32",
+    "emotion_score": "float32"
+}
+
+def dataset_path(name, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, name)
+
+def source_of(file_path):
+    """Platform a scraped file comes from, e.g. 'steam' for 'steam_comments_Limbo.csv'."""
+    return os.path.basename(file_path).split("_comments_")[0].lower()
+
+def encode_aspect(values):
+    """int8 aspect codes of a column holding codes or labels ("positive", ...);
+    unknown labels become 0 (none)."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("int8")
+    codes = pd.Categorical(values.astype(str).str.lower(), categories=ASPECT_LABELS).codes
+    return pd.Series(codes.clip(min=0).astype("int8"), index=values.index, name=values.name)
+
+def decode_aspects(df):
+    """Copy of `df` with the aspect codes turned into labels (e.g. for CSV files)."""
+    df = df.copy()
+    for aspect in ASPECT_COLUMNS:
+        if aspect in df.columns:
+            df[aspect] = pd.Categorical.from_codes(encode_aspect(df[aspect]), ASPECT_LABELS)
+    return df
+
+def apply_types(df):
+    """Give the known columns their storage types: categoricals for the
+    partition and label columns, int8 aspect codes, datetime64 dates and
+    narrow numbers."""
+    df = df.copy()
+    for column in PARTITION_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(str).astype("category")
+    for column, values in CATEGORIES.items():
+        if column in df.columns:
+            df[column] = pd.Categorical(df[column].astype(str).str.lower(), categories=values)
+    for aspect in ASPECT_COLUMNS:
+        if aspect in df.columns:
+            df[aspect] = encode_aspect(df[aspect])
+    for column, dtype in COLUMN_TYPES.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+    if "commented_date" in df.columns:
+        df["commented_date"] = pd.to_datetime(df["commented_date"], errors="coerce")
+    if "comment" in df.columns:
+        df["comment"] = df["comment"].astype(str)
+    return df
+
+class DatasetWriter:
+    """Write a dataset part by part (e.g. one chunk at a time, in order). The
+    parts go to a temporary directory that replaces the old dataset on close(),
+    so readers never see a half-written dataset."""
+
+    def __init__(self, name, store_dir=None):
+        self.name = name
+        self.path = dataset_path(name, store_dir)
+        self.tmp_path = f"{self.path}.tmp"
+        self.parts = 0
+        self.rows = 0
+        self.dropped = set()
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+
+    def write(self, df):
+        """Add a part (rows without a source get 'unknown')."""
+        if "source" not in df.columns:
+            df = df.assign(source="unknown")
+        if self.name in SCHEMAS:
+            extra = [column for column in df.columns if column not in SCHEMAS[self.name]]
+            if extra and not self.dropped.issuperset(extra):
+                print(f"Not storing columns outside the '{self.name}' schema: {extra}")
+            self.dropped.update(extra)
+            df = df.drop(columns=extra)
+        table = pa.Table.from_pandas(apply_types(df), preserve_index=False)
+        # Zero-padded part numbers keep the write order within a partition only: rows are read back
+        # grouped by genre and game, not in the overall order they were written in
+        pq.write_to_dataset(table, self.tmp_path, partition_cols=PARTITION_COLUMNS,
+                            basename_template=f"part-{self.parts:05d}-{{i}}.parquet",
+                            existing_data_behavior="overwrite_or_ignore")
+        self.parts += 1
+        self.rows += len(df)
+
+    def close(self):
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.tmp_path, exist_ok=True)  # An empty dataset is still a dataset
+        os.replace(self.tmp_path, self.path)
+        print(f"Saved {self.rows} rows to dataset '{self.name}' ({self.path})")
+
+def write_dataset(df, name, store_dir=None):
+    """Replace a dataset with `df`, written as Parquet files partitioned by
+    genre/game/source (rows without a source get 'unknown')."""
+    writer = DatasetWriter(name, store_dir)
+    writer.write(df)
+    writer.close()
+
+def _filter_expression(filters):
+    """{'game': ['Limbo', 'Stray'], 'source': 'steam'} -> a pyarrow filter expression."""
+    expression = None
+    for column, values in (filters or {}).items():
+        values = [values] if isinstance(values, str) or not hasattr(values, "__iter__") else list(values)
+        condition = ds.field(column).isin(values)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def _open_dataset(name, store_dir=None):
+    path = dataset_path(name, store_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No dataset '{name}' in {os.path.dirname(path)}: run the stage that writes it first")
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+def load_dataset(name, columns=None, filters=None, store_dir=None):
+    """Load a dataset as a typed DataFrame.
+    columns: only read these columns (partition columns included)
+    filters: {column: value or list of values}; partition filters only read
+             the matching directories"""
+    table = _open_dataset(name, store_dir).to_table(columns=columns, filter=_filter_expression(filters))
+    df = apply_types(table.to_pandas())
+    for column in PARTITION_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].cat.remove_unused_categories()  # Only the games that were loaded
+    return df
+
+def dataset_rows(name, store_dir=None):
+    """Number of rows, from the Parquet metadata."""
+    return _open_dataset(name, store_dir).count_rows()
+
+def iter_dataset(name, columns=None, chunk_size=10000, store_dir=None):
+    """Yield a dataset as typed DataFrames of `chunk_size` rows (the last one
+    shorter), reading from disk as it goes instead of loading everything."""
+    pending, rows = [], 0
+    for batch in _open_dataset(name, store_dir).to_batches(columns=columns, batch_size=chunk_size):
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield apply_types(table.slice(0, chunk_size).to_pandas())
+            rest = table.slice(chunk_size)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield apply_types(pa.Table.from_batches(pending).to_pandas())
+
+def dataset_info(name, store_dir=None):
+    """Rows and bytes on disk per partition."""
+    dataset = _open_dataset(name, store_dir)
+    rows = []
+    for fragment in dataset.get_fragments():
+        partition = ds.get_partition_keys(fragment.partition_expression)
+        rows.append({**partition, "rows": fragment.metadata.num_rows, "bytes": os.path.getsize(fragment.path)})
+    return pd.DataFrame(rows).groupby(PARTITION_COLUMNS, observed=True)[["rows", "bytes"]].sum()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, import or export the partitioned Parquet datasets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info_parser = commands.add_parser("info", help="Rows and size per partition")
+    info_parser.add_argument("name", choices=list(DATASETS))
+    import_parser = commands.add_parser("import", help="Load a CSV produced by an older version of the pipeline")
+    import_parser.add_argument("csv_file")
+    import_parser.add_argument("name", choices=list(DATASETS))
+    export_parser = commands.add_parser("export", help="Write a dataset (or some games of it) to CSV")
+    export_parser.add_argument("name", choices=list(DATASETS))
+    export_parser.add_argument("csv_file")
+    export_parser.add_argument("--games", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print(dataset_info(args.name).to_string())
+    elif args.command == "import":
+        write_dataset(pd.read_csv(args.csv_file), args.name)
+    else:
+        df = load_dataset(args.name, filters={"game": args.games} if args.games else None)
+        decode_aspects(df).to_csv(args.csv_file, index=False)
+        print(f"Exported dataset '{args.name}' to '{args.csv_file}'")
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from dataset_store import load_dataset, write_dataset
+
+# Optional emotion labelling stage: runs a flair text classifier over the
+# comments on CPU and adds `emotion` and `emotion_score` columns next to
+# `comment_sentiment`.
+#
+#     python emotion_stage.py --model path/to/emotion-classifier.pt
+#     python emotion_stage.py --model ... --sample 2000   # Throughput only, nothing written
+#
+# Comments are grouped by length so each batch pads to about the same length,
+# and the batch size of a bucket follows from TOKEN_BUDGET. Labels are cached by
+# model and comment, so reruns only classify new comments.
+
+CACHE_FILE = "../data/.emotion_cache.sqlite"
+LENGTH_BUCKETS = [16, 32, 64, 128, 256, 512]  # Upper word count of each bucket; longer comments go in the last one
+TOKEN_BUDGET = 4096  # Words per batch: short comments get big batches, long ones small batches
+MAX_BATCH = 256
+THREADS = min(4, os.cpu_count() or 1)  # More threads than cores only adds contention
+QUERY_CHUNK = 500  # Keys per SQL statement
+MISSING_FLAIR = "The emotion stage needs flair: pip install flair"
+
+def set_threads(threads):
+    """Cap the threads of torch and the math libraries it uses (call before loading the model)."""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    try:
+        import torch  # Installed with flair
+    except ImportError:
+        raise SystemExit(MISSING_FLAIR)
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+def load_model(name):
+    """A flair TextClassifier: a local .pt file or a model name TextClassifier.load accepts."""
+    try:
+        from flair.models import TextClassifier
+    except ImportError:
+        raise SystemExit(MISSING_FLAIR)
+    classifier = TextClassifier.load(name)
+    classifier.eval()
+    return classifier
+
+def comment_key(model, text):
+    """16-byte key of a comment under a model (labels differ between models)."""
+    return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).digest()[:16]
+
+class EmotionCache:
+    """(label, score) of every comment classified so far, in SQLite, keyed by comment_key."""
+
+    def __init__(self, path=None):
+        self.path = path or CACHE_FILE
+        self.db = sqlite3.connect(self.path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS emotions (key BLOB PRIMARY KEY, label TEXT, score REAL) WITHOUT ROWID")
+        self.db.commit()
+
+    def get(self, keys):
+        found = {}
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            rows = self.db.execute(
+                f"SELECT key, label, score FROM emotions WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((key, (label, score)) for key, label, score in rows)
+        return found
+
+    def add(self, entries):
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO emotions VALUES (?, ?, ?)",
+                                ((key, label, score) for key, (label, score) in entries.items()))
+
+def length_buckets(texts):
+    """Positions of the texts in each length bucket, shortest texts first
+    within a bucket. Returns [(bucket upper word count, positions)]."""
+    words = np.array([len(text.split()) for text in texts])
+    buckets = np.searchsorted(LENGTH_BUCKETS, words).clip(max=len(LENGTH_BUCKETS) - 1)
+    order = np.argsort(words, kind="stable")
+    return [(LENGTH_BUCKETS[bucket], order[buckets[order] == bucket])
+            for bucket in range(len(LENGTH_BUCKETS)) if (buckets == bucket).any()]
+
+def batch_size_for(max_words, token_budget=TOKEN_BUDGET):
+    return int(max(1, min(MAX_BATCH, token_budget // max_words)))
+
+def _predict(classifier, texts, batch_size):
+    """Top label and score of every text. Halves the batch size when a batch
+    runs out of memory, and returns the batch size that worked."""
+    from flair.data import Sentence
+    while True:
+        try:
+            sentences = [Sentence(text) for text in texts]
+            classifier.predict(sentences, mini_batch_size=batch_size, verbose=False)
+            break
+        except RuntimeError as e:
+            if "memory" not in str(e).lower() or batch_size == 1:
+                raise
+            batch_size = max(1, batch_size // 2)
+            print(f"Out of memory, retrying with batches of {batch_size}")
+    results = []
+    for sentence in sentences:
+        label = sentence.get_labels()[0] if sentence.get_labels() else None
+        results.append((label.value.lower(), float(label.score)) if label else (None, np.nan))
+    return results, batch_size
+
+def classify(texts, classifier, model, cache=None, token_budget=TOKEN_BUDGET):
+    """Emotion label and score of every text (each distinct text classified
+    once). Returns the labels, the scores and a throughput report per bucket."""
+    texts = [str(text) for text in texts]
+    keys = [comment_key(model, text) for text in texts]
+    unique = {}
+    for key, text in zip(keys, texts):
+        unique.setdefault(key, text)
+    found = cache.get(list(unique)) if cache is not None else {}
+    missing_keys = [key for key in unique if key not in found]
+    missing_texts = [unique[key] for key in missing_keys]
+    print(f"{len(texts)} comments, {len(unique)} distinct, {len(found)} cached, {len(missing_keys)} to classify")
+
+    report = []
+    for max_words, positions in length_buckets(missing_texts):
+        bucket_texts = [missing_texts[i] for i in positions]
+        batch_size = batch_size_for(max_words, token_budget)
+        start = time.perf_counter()
+        results, batch_size = _predict(classifier, bucket_texts, batch_size)
+        elapsed = time.perf_counter() - start
+        computed = {missing_keys[i]: result for i, result in zip(positions, results)}
+        found.update(computed)
+        if cache is not None:
+            cache.add(computed)  # Per bucket, so an interrupted run keeps what it finished
+        report.append({"max_words": max_words, "comments": len(positions), "batch_size": batch_size,
+                       "seconds": round(elapsed, 2), "comments/s": round(len(positions) / elapsed, 1) if elapsed else None})
+        print(f"Bucket <= {max_words} words: {len(positions)} comments in {elapsed:.1f}s")
+
+    labels = [found[key][0] for key in keys]
+    scores = np.array([found[key][1] for key in keys], dtype=float)
+    return labels, scores, pd.DataFrame(report)
+
+def add_emotion_columns(df, labels, scores):
+    """Insert `emotion` and `emotion_score` right after `comment_sentiment`."""
+    df = df.drop(columns=["emotion", "emotion_score"], errors="ignore")
+    position = df.columns.get_loc("comment_sentiment") + 1 if "comment_sentiment" in df.columns else len(df.columns)
+    df.insert(position, "emotion", labels)
+    df.insert(position + 1, "emotion_score", scores)
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="Add flair emotion labels to a dataset.")
+    parser.add_argument("--model", required=True, help="flair TextClassifier trained on emotions (.pt file or model name)")
+    parser.add_argument("--dataset", default="enhanced", choices=["reviews", "enhanced"])
+    parser.add_argument("--threads", type=int, default=THREADS, help="CPU threads used by torch")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET, help="Words per batch")
+    parser.add_argument("--sample", type=int, help="Only time this many comments and estimate the full run; nothing is written")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    set_threads(args.threads)
+    classifier = load_model(args.model)
+    cache = None if args.no_cache or args.sample else EmotionCache()
+    df = load_dataset(args.dataset)
+    comments = df["comment"] if not args.sample else df["comment"].sample(min(args.sample, len(df)), random_state=0)
+
+    start = time.perf_counter()
+    labels, scores, report = classify(comments, classifier, args.model, cache, args.token_budget)
+    elapsed = time.perf_counter() - start
+    print(report.to_string(index=False))
+    rate = len(comments) / elapsed if elapsed else float("inf")
+    print(f"{len(comments)} comments in {elapsed:.1f}s ({rate:.1f} comments/s, {args.threads} threads)")
+    if args.sample:
+        print(f"Estimated time for all {len(df)} comments of '{args.dataset}': {len(df) / rate / 60:.1f} min")
+        return
+    df = add_emotion_columns(df, labels, scores)
+    print(df["emotion"].value_counts(dropna=False))
+    write_dataset(df, args.dataset)
+
+if __name__ == "__main__":
+    main()
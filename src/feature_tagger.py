@@ -0,0 +1,95 @@
+import argparse
+import re
+import numpy as np
+from aspect_matcher import _trie_pattern
+
+# Tag comments with the game features they mention (postprocess.feature_patterns)
+# in one regex scan.
+#
+# All feature patterns are compiled into one alternation of named groups. The
+# lower-cased comments of a batch are joined with line breaks and scanned once;
+# every match sets its feature's bit in the comment's bitmask (uint8 for up to 8
+# features).
+#
+# Patterns that are plain word lists (r"\b(bug|glitch|crash)\b", all of the
+# current ones) are merged into a single WORDS group shaped like a trie
+# (aspect_matcher._trie_pattern) and the matched word is looked up to find its
+# feature: with one named group per feature, the regex engine tries all eight
+# groups at every position, which measured about 2x slower than the trie.
+# Patterns must not overlap each other (no word in two features), since a span
+# matched by one feature is not scanned again for the others.
+
+WORDS = "_words"  # Group of the merged word-list patterns
+WORD_LIST = re.compile(r"\\b\((?:\?:)?([\w \-|]+)\)\\b")  # r"\b(word|two words|co-op)\b"
+
+class FeatureTagger:
+    """Compiled tagger for {feature: regex}."""
+
+    def __init__(self, patterns):
+        self.features = list(patterns)
+        self.bits = {feature: 1 << i for i, feature in enumerate(self.features)}
+        self.dtype = np.min_scalar_type((1 << len(self.features)) - 1) if self.features else np.uint8
+        self.word_features = {}
+        groups = []
+        for feature, pattern in patterns.items():
+            word_list = WORD_LIST.fullmatch(pattern)
+            if word_list:
+                for word in word_list.group(1).split("|"):
+                    self.word_features[word.replace("\\-", "-")] = feature
+            else:
+                groups.append(f"(?P<{feature}>{pattern})")
+        if self.word_features:
+            # Spaces stay literal, as in the patterns (and so no match spans two joined comments)
+            groups.insert(0, rf"\b(?P<{WORDS}>{_trie_pattern(self.word_features, space=' ')})\b")
+        self.pattern = re.compile("|".join(groups))
+
+    def feature_of(self, match):
+        if match.lastgroup == WORDS:
+            return self.word_features[match.group(WORDS)]
+        return match.lastgroup
+
+    def tag(self, comments):
+        """Bitmask of the features every comment mentions (bit i = i-th feature)."""
+        lowered = [str(comment).lower() for comment in comments]
+        masks = np.zeros(len(lowered), dtype=self.dtype)
+        if not lowered:
+            return masks
+        lengths = np.array([len(comment) for comment in lowered])
+        starts = np.cumsum(lengths + 1) - lengths - 1  # Offset of each comment in the joined text
+        positions, bits = [], []
+        for match in self.pattern.finditer("\n".join(lowered)):
+            positions.append(match.start())
+            bits.append(self.bits[self.feature_of(match)])
+        rows = np.searchsorted(starts, positions, side="right") - 1
+        np.bitwise_or.at(masks, rows, np.array(bits, dtype=self.dtype))
+        return masks
+
+    def expand(self, masks):
+        """{feature: boolean array} from the bitmasks."""
+        return {feature: (masks & bit) != 0 for feature, bit in self.bits.items()}
+
+def apply_search(comments, patterns):
+    """The previous tagging code (one lower-casing and re.search pass per feature), for comparison."""
+    return {feature: comments.astype(str).str.lower().apply(lambda x: bool(re.search(pattern, x))).to_numpy()
+            for feature, pattern in patterns.items()}
+
+def benchmark(data_dir, sample=None):
+    """Time the tagger against the per-feature passes on the scraped comments."""
+    from comment_benchmark import print_timings, sample_comments, timed
+    from postprocess import feature_patterns
+
+    comments = sample_comments(data_dir, sample)
+    old, search_time = timed(apply_search, comments, feature_patterns)
+    tagger = FeatureTagger(feature_patterns)
+    new, tagger_time = timed(lambda: tagger.expand(tagger.tag(comments)))
+
+    print_timings(len(comments), {"per-feature re.search": search_time, "FeatureTagger": tagger_time})
+    differences = {feature: int((old[feature] != new[feature]).sum()) for feature in feature_patterns}
+    print(f"Rows tagged differently: {differences}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fused feature tagger against per-feature regex passes.")
+    parser.add_argument("--data-dir", default="../data")
+    parser.add_argument("--sample", type=int, default=20000, help="Number of comments compared (0 = all)")
+    args = parser.parse_args()
+    benchmark(args.data_dir, args.sample)
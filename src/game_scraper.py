@@ -1,16 +1,17 @@
 import os
 import time
-import requests
-import pandas as pd
-import praw
 import re
-from googleapiclient.discovery import build
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
-from datetime import datetime, timezone
+from datetime import datetime
+import clients
+from browser_pool import get_browser_pool, scroll_until_stable
+from metacritic_parser import REVIEW_SELECTOR, parse_reviews
+from reddit_fetcher import fetch_comments
+from checkpoints import load_checkpoint, save_checkpoint, timestamp_to_date
+from scrape_engine import platform_limits, run_platforms
+from sinks import CsvSink
+from steam_fetcher import fetch_reviews as fetch_steam_reviews, throttle as throttle_steam
+from youtube_quota import QuotaExceeded, get_planner
 
 load_dotenv() # load keys
 
@@ -54,34 +55,19 @@ GAMES = {
         "It Takes Two": "1426210"
     }
 }
+STEAM_MAX_REVIEWS = 1000  # Total number of Steam reviews to scrap per game and run
+# If set, the rendered Metacritic pages are saved there too (fixtures for benchmark_scrapers.py)
+METACRITIC_HTML_DIR = os.getenv("METACRITIC_HTML_DIR")
 # KEYS
-REDDIT_CREDENTIALS = { # Get Reddit credentials
-    "client_id": os.getenv("REDDIT_CLIENT_ID"),
-    "client_secret": os.getenv("REDDIT_CLIENT_SECRET"),
-    "user_agent": os.getenv("REDDIT_USER_AGENT")
-}
 TWITTER_CREDENTIALS = { # Get Twitter credentials
     "bearer_token": os.getenv("TWITTER_BEARER_TOKEN"),
     "username": os.getenv("TWITTER_USERNAME")
 }
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")  # Get Youtube credential
 # VALIDATION FUNCTIONS
-def validate_reddit(): # Make sure reddit credential are valid
-    try:
-        reddit = praw.Reddit(**REDDIT_CREDENTIALS)
-        reddit.user.me()
-        return True
-    except Exception as e:
-        print(f"Reddit API error: {e}")
-        return False
-def validate_youtube(): # Make sure youtube credential are valid
-    try:
-        youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-        youtube.search().list(q="test", part="snippet", maxResults=1).execute()
-        return True
-    except Exception as e:
-        print(f"YouTube API error: {e}")
-        return False
+def validate_reddit(): # Make sure reddit credential are valid (cached per process)
+    return clients.validate("reddit")
+def validate_youtube(): # Make sure youtube credential are valid (cached per process)
+    return clients.validate("youtube")
     
 def clean_text(text):
     """This function removes extra spaces while preserving new lines correctly."""
@@ -94,235 +80,312 @@ def clean_text(text):
 
 # SCRAPING FUNCTIONS
 def scrape_reddit(genre, game, directory):
-    """This function searches for Reddit reviews for a specific game."""
+    """This function searches for Reddit reviews for a specific game.
+    Comment trees of the posts found are expanded in parallel and paced by
+    Reddit's rate-limit headers (see reddit_fetcher.py)."""
     try:
-        reddit = praw.Reddit(**REDDIT_CREDENTIALS)
-        subreddit = reddit.subreddit("gaming")
-        posts = subreddit.search(game, limit=50, time_filter="all")
-        data = []
-        for post in posts:
-            time.sleep(3)
-            post.comments.replace_more(limit=20)  # Load top-level comments
-            for comment in post.comments.list():
-                if isinstance(comment, praw.models.MoreComments):  
-                    continue  # Skip 'MoreComments' objects
-                comment_date = datetime.fromtimestamp(comment.created_utc, tz=timezone.utc).strftime('%Y-%m-%d')
-                comment = clean_text(comment.body)
-                data.append([genre, game, comment_date, comment])
-        # Save to CSV if data exists ( post.score, comment.score)
-        if data:
-            df = pd.DataFrame(data, columns=["genre", "game", "commented_date", "comment"])
-            df.to_csv(f"{directory}/reddit_comments_{game}.csv", index=False)
-            print(f"\tReddit {len(data)} data for {game} saved!")
+        start = time.perf_counter()
+        # Rows are streamed to disk post by post (post.score, comment.score)
+        with CsvSink(f"{directory}/reddit_comments_{game}.csv", mode="w") as sink:
+            for comments in fetch_comments(game):
+                sink.write([
+                    [genre, game, timestamp_to_date(created_utc), clean_text(body)]
+                    for created_utc, body in comments
+                ])
+        elapsed = time.perf_counter() - start
+        if sink.rows_written:
+            print(f"\tReddit {sink.rows_written} data for {game} saved! "
+                  f"({sink.rows_written / elapsed:.1f} comments/sec, {sink.bytes_written / 1024:.0f} KB)")
         else:
             print(f"\tNo Reddit data for {game}.")
     except Exception as e:
         print(f"\tError scraping Reddit for {game}..: {e}")
 
 def scrape_youtube(genre, game, directory):
-    """This function searches for YouTube reviews for a specific game."""
+    """This function searches for YouTube reviews for a specific game.
+    The first run collects the most relevant comments of the most-commented
+    videos; later runs only fetch comments newer than the checkpoint and append
+    them. Every call is booked against the daily quota (see youtube_quota.py);
+    a run that is interrupted or out of quota resumes from the stored video
+    and page token."""
+    file_path = f"{directory}/youtube_comments_{game}.csv"
+    planner = get_planner()
+    job = (genre, game)
+    planner.start_game(job)  # Reserve this game's share of today's quota
     try:
-        youtube = build("youtube", "v3", developerKey=os.getenv("YOUTUBE_API_KEY"))
-        search_request = youtube.search().list(
-            q=game,
-            part="snippet",
-            maxResults=100,  # Search for top 50 videos related to the game
-            type="video"
-        )
-        search_response = search_request.execute()
-        all_comments = []
-        
-        for item in search_response.get("items", []):
-            video_id = item["id"].get("videoId")
-            
-            if not video_id:
-                print(f"Skipping video due to missing videoId: {item['snippet']['title']}")
-                continue  # Skip if the videoId is missing   
-            # try:  # Check if comments are enabled for this video
-            #     comments_request = youtube.commentThreads().list(
-            #         part="snippet",
-            #         videoId=video_id,
-            #         textFormat="plainText",
-            #         maxResults=1  # Just to check if comments are enabled
-            #     ).execute()
-            # except Exception as e:
-            #     if "commentsDisabled" in str(e):
-            #         continue  # Skip this video if comments are disabled
-            #     else:
-            #         raise
-            
-            comments = []
-            next_page_token = None
-            max_comment_count = 100
-            while len(comments) < max_comment_count:  # Fetch up to 500 comments for this video
+        youtube = clients.get_youtube()
+        checkpoint = load_checkpoint("youtube", genre, game)
+        newest = checkpoint.get("newest_timestamp", 0)
+        if checkpoint.get("videos"):  # Interrupted run: resume where it stopped
+            videos = checkpoint["videos"]
+            video_index = checkpoint["video_index"]
+            next_page_token = checkpoint.get("page_token")
+            video_count = checkpoint.get("video_count", 0)
+            since = checkpoint.get("since", 0)
+            print(f"\tResuming YouTube for {game} at video {video_index + 1}/{len(videos)}")
+        else:
+            videos = planner.videos(youtube, job)  # Most-commented videos first
+            video_index, next_page_token, video_count = 0, None, 0
+            since = newest  # Only keep comments newer than the last run
+        # The first full crawl writes a fresh file (kept aside until it completes); refreshes append
+        first_crawl = not since
+        # Newest first when refreshing, so we can stop at the watermark
+        order = "time" if since else "relevance"
+        max_comment_count = 100
+
+        # Progress that matches the rows on disk; saved every time the sink flushes
+        state = {"videos": videos, "video_index": video_index, "page_token": next_page_token,
+                 "video_count": video_count, "since": since, "newest_timestamp": newest}
+        with CsvSink(file_path, mode="w" if first_crawl else "a", resume=bool(checkpoint.get("videos")),
+                     on_flush=lambda: save_checkpoint("youtube", genre, game, dict(state))) as sink:
+            while video_index < len(videos):
                 request = youtube.commentThreads().list(
                     part="snippet",
-                    videoId=video_id,
+                    videoId=videos[video_index],
                     textFormat="plainText",
-                    order="relevance",
-                    maxResults=min(max_comment_count, max_comment_count - len(comments)),  # Fetch remaining comments
+                    order=order,
+                    maxResults=max_comment_count - video_count,  # Fetch remaining comments
                     pageToken=next_page_token
                 )
-                response = request.execute()
-                
+                planner.spend(job, "commentThreads.list")
+                try:
+                    response = request.execute()
+                except Exception as e:
+                    if "quotaExceeded" in str(e):
+                        planner.exhaust()
+                        raise QuotaExceeded("YouTube reported the daily quota as used up") from e
+                    if "commentsDisabled" not in str(e):
+                        raise
+                    response = {}  # Skip this video if comments are disabled
+
+                comments = []
+                reached_known = False
                 for item in response.get("items", []):
                     comment_data = item["snippet"]["topLevelComment"]["snippet"]
-                    comment_date = datetime.fromisoformat(comment_data["publishedAt"].replace("Z", "+00:00")).strftime('%Y-%m-%d')
+                    published = datetime.fromisoformat(comment_data["publishedAt"].replace("Z", "+00:00"))
+                    timestamp = int(published.timestamp())
+                    if timestamp <= since:
+                        reached_known = True  # Everything after this was saved by an earlier run
+                        break
+                    newest = max(newest, timestamp)
                     comment = clean_text(comment_data["textDisplay"])
                     comments.append([
                         genre,
                         game,
-                        comment_date,
+                        published.strftime('%Y-%m-%d'),
                         comment,
                     ])
-                    if len(comments) >= max_comment_count:
+                    if video_count + len(comments) >= max_comment_count:
                         break  # Stop when we have enough comments
-                
+                video_count += len(comments)
+
                 next_page_token = response.get("nextPageToken")
-                if not next_page_token:
-                    break  # No more pages left
-            
-            # Add to total comments list
-            all_comments.extend(comments)
-        
-        # Save data if comments exist
-        if all_comments:
-            df = pd.DataFrame(all_comments, columns=["genre", "game",  "commented_date", "comment"])
-            df.to_csv(f"{directory}/youtube_comments_{game}.csv", index=False)
-            print(f"\tYoutube data for {game} saved!")
+                if reached_known or not next_page_token or video_count >= max_comment_count:
+                    video_index, next_page_token, video_count = video_index + 1, None, 0  # Move on to the next video
+                state.update(video_index=video_index, page_token=next_page_token,
+                             video_count=video_count, newest_timestamp=newest)
+                sink.write(comments)
+
+        # Crawl complete: only the watermark is kept for the next refresh
+        save_checkpoint("youtube", genre, game, {
+            "newest_timestamp": newest,
+            "newest_date": timestamp_to_date(newest) if newest else None
+        })
+        if sink.rows_written:
+            print(f"\tYoutube {sink.rows_written} new comments for {game} saved! ({sink.bytes_written / 1024:.0f} KB)")
         else:
-            print(f"\tNo Youtube data for {game}.")
-    
+            print(f"\tNo new Youtube data for {game}.")
+
+    except QuotaExceeded as e:  # The checkpoint lets the next run pick up from here
+        print(f"\tYouTube quota reached for {game}, resuming on the next run: {e}")
     except Exception as e:
         print(f"\tError scraping YouTube for {game}: {e}")
-    
-def scrape_steam(genre, game, directory, steamID):
-    """This function searches for Steam reviews for a specific game."""
+    finally:
+        planner.finish_game(job)
+
+def scrape_steam_history(genre, game, file_path, steamID, num_reviews):
+    """First crawl of a game: fetch its review history in parallel date
+    windows (see steam_fetcher.py) and store the newest review as watermark.
+    If a window fails, the error propagates before anything is saved: the old
+    file stays and the next run fetches the history again."""
+    newest = 0
+    with CsvSink(file_path, mode="w") as sink:
+        for page in fetch_steam_reviews(steamID, max_reviews=num_reviews):
+            newest = max(newest, max(review["timestamp_created"] for review in page))
+            sink.write([
+                [genre, game, timestamp_to_date(review["timestamp_created"]), clean_text(review["review"])]
+                for review in page
+            ])
+    save_checkpoint("steam", genre, game, {
+        "newest_timestamp": newest,
+        "newest_date": timestamp_to_date(newest) if newest else None
+    })
+    print(f"\tSteam {sink.rows_written} reviews for {game} saved! ({sink.bytes_written / 1024:.0f} KB)")
+
+def scrape_steam(genre, game, directory, steamID, num_reviews=STEAM_MAX_REVIEWS):
+    """This function searches for Steam reviews for a specific game.
+    The first run fetches the history in parallel date windows; later runs read
+    newest first, stop at the newest review of the previous run and append
+    only what is new. An interrupted refresh resumes from the stored cursor."""
     if steamID is None:  # Not released
         print(f"\tNo Steam data for {game}.")
         return
-    
-    url = f"https://store.steampowered.com/appreviews/{steamID}?json=1&num_per_page=100&filter=creation_date"  # Sort by creation date
+
+    url = f"{clients.endpoint('steam')}/appreviews/{steamID}?json=1&num_per_page=100&filter=recent"  # Sort by creation date
     print(url)
-    all_reviews = []
-    cursor = "*"  # Initial cursor for the first page
-    num_reviews = 1000  # Total number of reviews to scrap
-    
-    while len(all_reviews) < num_reviews:
-        # Make the request with the current cursor
-        response = requests.get(f"{url}&cursor={cursor}")
-        data = response.json()
-        
-        # Check if 'reviews' are in the response
-        if "reviews" not in data:
-            print(f"Error fetching reviews for {game}.")
-            break
-        
-        # Add the reviews from this page
-        for review in data["reviews"]:
-            comment_date = datetime.fromtimestamp(review["timestamp_created"], tz=timezone.utc).strftime('%Y-%m-%d')
-            comment = clean_text(review["review"])
-            all_reviews.append([
-                genre,
-                game, 
-                comment_date,
-                comment,
-            ])
-        
-        # Check if there's a 'cursor' for the next page
-        if "cursor" in data:
-            cursor = data["cursor"]  # Update the cursor for the next page
-        else:
-            print(f"No more reviews for {game}.")
-            break  # Stop if there are no more reviews
-    
-    # Limit to the requested number of reviews
-    all_reviews = all_reviews[:num_reviews]
-    
-    # Save the reviews to a CSV
-    df = pd.DataFrame(all_reviews, columns=["genre", "game",  "commented_date", "comment"])
-    df.to_csv(f"{directory}/steam_comments_{game}.csv", index=False)
-    print(f"\tSteam data for {game} saved!")
+    file_path = f"{directory}/steam_comments_{game}.csv"
+    session = clients.get_steam_session()  # Pooled keep-alive connections
+
+    checkpoint = load_checkpoint("steam", genre, game)
+    newest = checkpoint.get("newest_timestamp", 0)
+    if checkpoint.get("cursor"):  # Interrupted or capped run: resume where it stopped
+        cursor = checkpoint["cursor"]
+        since = checkpoint.get("since", 0)
+        fetched = checkpoint.get("fetched", 0)
+        print(f"\tResuming Steam for {game} after {fetched} reviews")
+    else:
+        cursor = "*"  # Initial cursor for the first page
+        since = newest  # Only keep reviews newer than the last run
+        fetched = 0
+    fresh = not checkpoint.get("cursor") and not since  # First full crawl starts a fresh file
+    if fresh:
+        scrape_steam_history(genre, game, file_path, steamID, num_reviews)
+        return
+
+    # Refresh: follow one cursor chain from the newest review down to the watermark.
+    # At most `num_reviews` per run (whole pages, so the cursor never skips a review);
+    # a capped run keeps its cursor and the next run fills the rest of the gap.
+    # Progress that matches the rows on disk; saved every time the sink flushes
+    state = {"cursor": cursor, "since": since, "fetched": fetched, "newest_timestamp": newest}
+    complete = False
+    run_fetched = 0
+    with CsvSink(file_path, mode="a", on_flush=lambda: save_checkpoint("steam", genre, game, dict(state))) as sink:
+        while run_fetched < num_reviews:
+            # Make the request with the current cursor (sharing the request rate of all Steam jobs)
+            throttle_steam()
+            response = session.get(url, params={"cursor": cursor})
+            data = response.json()
+
+            # Check if 'reviews' are in the response
+            if "reviews" not in data:
+                print(f"Error fetching reviews for {game}.")
+                return  # Keep the checkpoint so the next run resumes here
+
+            # Add the new reviews from this page
+            reviews = []
+            reached_known = False
+            for review in data["reviews"]:
+                if review["timestamp_created"] <= since:
+                    reached_known = True  # Everything after this was saved by an earlier run
+                    break
+                newest = max(newest, review["timestamp_created"])
+                comment = clean_text(review["review"])
+                reviews.append([
+                    genre,
+                    game,
+                    timestamp_to_date(review["timestamp_created"]),
+                    comment,
+                ])
+            fetched += len(reviews)
+            run_fetched += len(reviews)
+            next_cursor = data.get("cursor")
+            state.update(cursor=next_cursor, fetched=fetched, newest_timestamp=newest)
+            sink.write(reviews)
+
+            # Stop at the watermark, at the end of the history, or if Steam hands back the same cursor
+            if reached_known or not data["reviews"] or not next_cursor or next_cursor == cursor:
+                complete = True
+                break
+            cursor = next_cursor
+
+    if not complete:  # Capped: the reviews between here and the watermark are fetched next run
+        save_checkpoint("steam", genre, game, dict(state))
+        print(f"\tSteam {sink.rows_written} new reviews for {game} saved, more left for the next run "
+              f"({sink.bytes_written / 1024:.0f} KB)")
+        return
+    # Crawl complete: only the watermark is kept for the next refresh
+    save_checkpoint("steam", genre, game, {
+        "newest_timestamp": newest,
+        "newest_date": timestamp_to_date(newest) if newest else None
+    })
+    print(f"\tSteam {sink.rows_written} new reviews for {game} saved! ({sink.bytes_written / 1024:.0f} KB)")
 
-def scrape_metacritic(genre, game, directory):
-    """This function searches for Metacritic reviews for a specific game."""
+def scrape_metacritic(genre, game, directory, html_dir=None):
+    """This function searches for Metacritic reviews for a specific game.
+    If `html_dir` is given (default: METACRITIC_HTML_DIR), the rendered page is
+    also saved there so the extraction can be replayed offline (see
+    metacritic_parser.py and benchmark_scrapers.py)."""
+    html_dir = html_dir or METACRITIC_HTML_DIR
     # Sanitize game name for URL
     gameName = re.sub(r"[',:;]+", "", game.lower())  # Remove unwanted characters
     gameName = re.sub(r"\s+", "-", gameName)  # Replace spaces with '-'
-    url = f"https://www.metacritic.com/game/pc/{gameName}/user-reviews"
-    
-    # Set up Selenium WebDriver
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    driver.get(url)
-    time.sleep(2)  # Allow page to load
+    url = f"{clients.endpoint('metacritic')}/game/pc/{gameName}/user-reviews"
     print(url)
-    
-    # Scroll to load more reviews
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)  # Allow time for new content to load
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break  # Stop scrolling when no new content loads
-        last_height = new_height
-    
-    reviews = []
+
     try:
-        review_blocks = driver.find_elements(By.CSS_SELECTOR, ".c-siteReview")
-        # Loop through each review block and extract score, username, and quote
-        for review in review_blocks:
-            # Extract quote
-            quote_element = review.find_element(By.CSS_SELECTOR, ".c-siteReview_quote span")
-            quote = quote_element.text.strip() if quote_element else "No Quote"
-            comment = clean_text(quote)
-            # Extract date
-            date_element = review.find_element(By.CSS_SELECTOR, ".c-siteReviewHeader_reviewDate")
-            date_obj = datetime.strptime(date_element.text.strip(), "%b %d, %Y")
-            formatted_date = date_obj.strftime('%Y-%m-%d')
-            reviews.append([
-                genre, 
-                game,
-                formatted_date,
-                comment,
-            ])
-        driver.quit()
+        # Lease an already running headless browser from the pool
+        with get_browser_pool().lease() as driver:
+            driver.get(url)
+            # Scroll until no new reviews load
+            scroll_until_stable(driver, REVIEW_SELECTOR)
+            html = driver.page_source  # One round trip instead of two per review
+        if html_dir:
+            os.makedirs(html_dir, exist_ok=True)
+            with open(f"{html_dir}/metacritic_{gameName}.html", "w", encoding="utf-8") as f:
+                f.write(html)
+        # Extract quote and date of every review block in bulk
+        reviews = [
+            [genre, game, formatted_date, clean_text(quote)]
+            for formatted_date, quote in parse_reviews(html)
+        ]
         # Save reviews to CSV if there are any
         if reviews:
-            df = pd.DataFrame(reviews, columns=["genre", "game",  "commented_date", "comment"])
-            df.to_csv(f"{directory}/metacritic_comments_{game}.csv", index=False)
-            print(f"\tMetacritic data for {game} saved!")
+            with CsvSink(f"{directory}/metacritic_comments_{game}.csv", mode="w") as sink:
+                sink.write(reviews)
+            print(f"\tMetacritic {sink.rows_written} data for {game} saved! ({sink.bytes_written / 1024:.0f} KB)")
         else:
             print(f"\tNo Metacritic data for {game}.")
     except Exception as e:
         print(f"\tError scraping Metacritic for {game}: {e}")
-        driver.quit()
 
 # Run scrappers for each game
-def run_scraper():
-    """Loops through the list of games for each genre, and calls scraping 
-    functions to gather data from various platforms (Reddit, Steam, etc.)."""
+def scrape_reddit_job(genre, game, directory):
+    """Reddit job for the engine: validate credentials, then scrape."""
+    if validate_reddit():
+        scrape_reddit(genre, game, directory)
+
+def scrape_youtube_job(genre, game, directory):
+    """YouTube job for the engine: validate credentials, then scrape."""
+    if validate_youtube():
+        scrape_youtube(genre, game, directory)
+
+SCRAPERS = {
+    "reddit": scrape_reddit_job,
+    "youtube": scrape_youtube_job,
+    "steam": scrape_steam,
+    "metacritic": scrape_metacritic
+}
+
+def run_scraper(platforms=None, limits=None, data_dir="../data"):
+    """Builds one queue of (genre, game) jobs per platform (Reddit, Steam, etc.)
+    and runs all queues concurrently, each with its own concurrency and rate
+    limit (see scrape_engine.PLATFORM_LIMITS, overridable through `limits`)."""
+    platforms = platforms or list(SCRAPERS)
+    jobs = {platform: [] for platform in platforms}
     for genre, game_list in GAMES.items():
-        directory = f"../data/{genre}"
+        directory = f"{data_dir}/{genre}"
         os.makedirs(directory, exist_ok=True)
         for game, steamID in game_list.items():
-            print(f"Scraping data for: {game} ({genre})...")
-            # get reddit comments
-            if validate_reddit(): 
-                scrape_reddit(genre, game, directory)
-            # get youtube comments
-            if validate_youtube():
-                scrape_youtube(genre, game, directory)
-            # get steam comments
-            scrape_steam(genre, game, directory, steamID)
-            # get metacritic comments
-            scrape_metacritic(genre, game, directory)
-        time.sleep(5)  # Avoid rate limits 
+            for platform in platforms:
+                if platform == "steam":
+                    jobs[platform].append((genre, game, directory, steamID))
+                else:
+                    jobs[platform].append((genre, game, directory))
+    if "youtube" in jobs:
+        get_planner().register((genre, game) for genre, game, _ in jobs["youtube"])  # Spread the daily quota
+    if "metacritic" in jobs:
+        get_browser_pool(platform_limits("metacritic", limits)["concurrency"])  # One browser per concurrent job
+    run_platforms(jobs, SCRAPERS, limits)
 
 def main():
     run_scraper() # run scrapper
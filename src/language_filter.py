@@ -0,0 +1,118 @@
+import argparse
+import hashlib
+import pandas as pd
+from langdetect import detect, DetectorFactory
+from langdetect.lang_detect_exception import LangDetectException
+
+DetectorFactory.seed = 0  # Ensure consistent language detection
+
+# Common English function words; a sentence without any of them is rarely English
+STOPWORDS = frozenset("""
+a about all an and are as at be been but by can could did do does for from had has have he her his how
+i if in is it its just me my no not of on one or our out so than that the their them there these they
+this those to too up very was we were what when which who why will with would you your
+""".split())
+
+MIN_ASCII_RATIO = 0.6  # Below this share of ASCII characters a comment is rejected outright
+ACCEPT_MIN_WORDS = 6  # Accept without langdetect: at least this many words ...
+ACCEPT_STOPWORD_RATE = 0.2  # ... of which at least this share are stopwords
+REJECT_MIN_WORDS = 8  # Reject without langdetect: at least this many words and no stopword at all
+
+_cache = {}  # Comment hash -> langdetect says English
+_stats = {"accepted": 0, "rejected": 0, "detected": 0, "cached": 0}
+
+def comment_hash(comment):
+    """Stable key of a comment, the same in every process and run."""
+    return hashlib.sha1(comment.encode("utf-8")).hexdigest()
+
+def _langdetect_english(comment):
+    """The old check: langdetect on the whole comment."""
+    try:
+        return detect(comment) == 'en'
+    except LangDetectException:
+        return False  # Nothing langdetect can read (no letters)
+
+def detect_english(comment):
+    """langdetect on one comment, cached by comment hash."""
+    key = comment_hash(comment)
+    if key in _cache:
+        _stats["cached"] += 1
+        return _cache[key]
+    result = _langdetect_english(comment)
+    _cache[key] = result
+    _stats["detected"] += 1
+    return result
+
+def heuristic_tiers(comments):
+    """First tier for a Series of comments: True (surely English), False (surely not)
+    or None (ambiguous, needs langdetect), computed column-wise."""
+    comments = comments.astype(str).reset_index(drop=True)
+    lengths = comments.str.len().clip(lower=1)
+    ascii_ratio = comments.str.count(r'[\x00-\x7f]') / lengths
+
+    words = comments.str.lower().str.findall(r"[a-z]+(?:'[a-z]+)?")
+    word_counts = words.str.len()
+    exploded = words.explode()
+    hits = exploded.isin(STOPWORDS) & exploded.notna()
+    stopword_hits = hits.groupby(level=0).sum().reindex(comments.index, fill_value=0)
+    stopword_rate = stopword_hits / word_counts.clip(lower=1)
+
+    accept = (ascii_ratio >= MIN_ASCII_RATIO) & (word_counts >= ACCEPT_MIN_WORDS) & (stopword_rate >= ACCEPT_STOPWORD_RATE)
+    reject = (ascii_ratio < MIN_ASCII_RATIO) | ((word_counts >= REJECT_MIN_WORDS) & (stopword_hits == 0))
+    tiers = pd.Series(None, index=comments.index, dtype=object)
+    tiers[accept] = True
+    tiers[reject & ~accept] = False
+    return tiers
+
+def english_mask(comments):
+    """Boolean mask of the English comments in a Series. The heuristic settles
+    the obvious cases; only the ambiguous ones are passed to langdetect."""
+    tiers = heuristic_tiers(comments)
+    ambiguous = tiers.isna()
+    _stats["accepted"] += int((tiers == True).sum())
+    _stats["rejected"] += int((tiers == False).sum())
+    values = comments.astype(str).reset_index(drop=True)
+    tiers[ambiguous] = values[ambiguous].map(detect_english)
+    return pd.Series(tiers.astype(bool).to_numpy(), index=comments.index)
+
+def is_english(comment):
+    """Detects if a single comment is in English."""
+    return bool(english_mask(pd.Series([comment])).iloc[0])
+
+def stats():
+    """How many comments each tier settled since the process started."""
+    return dict(_stats)
+
+def load_comments(data_dir):
+    """Every comment of the scraped CSVs that reaches the language check in clean_data."""
+    from clean_data import list_csv_files, valid_text_mask
+    frames = [pd.read_csv(path, usecols=["comment"]) for path in list_csv_files(data_dir)]
+    comments = pd.concat(frames, ignore_index=True)["comment"]
+    return comments[valid_text_mask(comments)].astype(str).reset_index(drop=True)
+
+def report(data_dir, sample=None):
+    """Compare the tiered filter with langdetect on every comment (the old behavior)."""
+    from comment_benchmark import print_timings, sample_comments, timed
+
+    comments = sample_comments(data_dir, sample)
+    baseline, baseline_time = timed(comments.map, _langdetect_english)
+
+    _cache.clear()
+    for key in _stats:
+        _stats[key] = 0
+    tiered, tiered_time = timed(english_mask, comments)
+
+    agree = (baseline == tiered).mean()
+    print_timings(len(comments), {"langdetect": baseline_time, "tiered": tiered_time},
+                  english=[int(baseline.sum()), int(tiered.sum())])
+    print(f"Agreement with langdetect: {agree:.2%}")
+    print(f"Kept only by tiered: {int((tiered & ~baseline).sum())}, dropped only by tiered: {int((~tiered & baseline).sum())}")
+    print(f"Settled by heuristic: {_stats['accepted']} accepted, {_stats['rejected']} rejected; "
+          f"langdetect: {_stats['detected']} calls, {_stats['cached']} cache hits")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy and speed of the tiered language filter against langdetect.")
+    parser.add_argument("--data-dir", default="../data")
+    parser.add_argument("--sample", type=int, default=None, help="Only compare a random sample of this many comments")
+    args = parser.parse_args()
+    report(args.data_dir, args.sample)
@@ -0,0 +1,57 @@
+import argparse
+import time
+from datetime import datetime
+from bs4 import BeautifulSoup, SoupStrainer
+
+REVIEW_SELECTOR = ".c-siteReview"
+QUOTE_SELECTOR = ".c-siteReview_quote span"
+DATE_SELECTOR = ".c-siteReviewHeader_reviewDate"
+
+# Only build the tree for review blocks; the rest of the page is skipped
+REVIEW_BLOCKS = SoupStrainer(class_=lambda value: value is not None and "c-siteReview" in value.split())
+
+def parse_reviews(html):
+    """Extract every user review from a Metacritic review page in one pass.
+    Returns a list of (commented_date, quote) tuples, dates as 'YYYY-MM-DD'.
+    Blocks without a readable date are skipped."""
+    soup = BeautifulSoup(html, "lxml", parse_only=REVIEW_BLOCKS)
+    reviews = []
+    for block in soup.select(REVIEW_SELECTOR):
+        date_element = block.select_one(DATE_SELECTOR)
+        if date_element is None:
+            continue
+        try:
+            date_obj = datetime.strptime(date_element.get_text(strip=True), "%b %d, %Y")
+        except ValueError:
+            continue
+        quote_element = block.select_one(QUOTE_SELECTOR)
+        quote = quote_element.get_text(" ", strip=True) if quote_element else "No Quote"
+        reviews.append((date_obj.strftime('%Y-%m-%d'), quote))
+    return reviews
+
+def main():
+    """Benchmark the parser on saved Metacritic pages."""
+    parser = argparse.ArgumentParser(description="Parse saved Metacritic review pages and time the extraction.")
+    parser.add_argument("files", nargs="+", help="HTML files saved from Metacritic user-review pages")
+    parser.add_argument("--repeat", type=int, default=5, help="Parse every file this many times")
+    args = parser.parse_args()
+
+    pages = []
+    for file_path in args.files:
+        with open(file_path, encoding="utf-8") as f:
+            pages.append((file_path, f.read()))
+
+    total_reviews = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for file_path, html in pages:
+            total_reviews += len(parse_reviews(html))
+    elapsed = time.perf_counter() - start
+
+    for file_path, html in pages:
+        print(f"{file_path}: {len(parse_reviews(html))} reviews")
+    print(f"Parsed {len(pages) * args.repeat} pages in {elapsed:.2f}s "
+          f"({total_reviews / elapsed:.0f} reviews/sec, {elapsed / (len(pages) * args.repeat) * 1000:.1f} ms/page)")
+
+if __name__ == "__main__":
+    main()
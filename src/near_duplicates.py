@@ -0,0 +1,173 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+THRESHOLD = 0.8  # Estimated Jaccard similarity of two comments' shingles to call them duplicates
+NUM_PERM = 64  # MinHash functions per signature
+SHINGLE_SIZE = 5  # Characters per shingle
+MIN_CHARS = 30  # Shorter comments ("great game") are only removed as exact duplicates
+BATCH_SHINGLES = 100_000  # Shingles hashed at once (memory: BATCH_SHINGLES * NUM_PERM * 8 bytes)
+PRIME = (1 << 31) - 1  # Shingle hashes are taken modulo this Mersenne prime
+
+def normalize(comments):
+    """Lower-case letters and digits separated by single spaces, so punctuation,
+    emoji and spacing differences do not count."""
+    return (comments.fillna("").astype(str).str.lower()
+            .str.replace(r"[^a-z0-9]+", " ", regex=True)
+            .str.strip())
+
+def lsh_bands(threshold, num_perm=NUM_PERM):
+    """Split the signature into `bands` bands of `rows` rows so that pairs at
+    about `threshold` similarity have an even chance of sharing a bucket."""
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+def _shingle_hashes(texts, shingle_size):
+    """Hash every character shingle of a batch of texts in one vectorized pass.
+    Returns the hashes and the offset of each text's first shingle."""
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    powers = np.array([257 ** i for i in range(shingle_size)], dtype=np.uint64)
+    window_hashes = _mod_prime(sliding_window_view(buffer, shingle_size) @ powers)
+
+    # Keep the windows that lie inside one text
+    counts = lengths - shingle_size + 1
+    text_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    shingle_offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = np.repeat(text_starts - shingle_offsets, counts) + np.arange(counts.sum())
+    return window_hashes[positions], shingle_offsets
+
+def _mod_prime(values):
+    """values modulo PRIME (up to PRIME itself) for values below 2**62, using
+    shifts instead of the much slower integer division."""
+    mask, shift = np.uint64(PRIME), np.uint64(31)
+    values = (values & mask) + (values >> shift)
+    return (values & mask) + (values >> shift)
+
+def minhash_signatures(texts, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=0):
+    """MinHash signature (num_perm uint32 values) of every text; texts must be
+    at least `shingle_size` bytes long."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # Odd multipliers
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+
+    start = 0
+    while start < len(texts):
+        # Grow the batch until it holds about BATCH_SHINGLES shingles
+        end, shingles = start, 0
+        while end < len(texts) and (end == start or shingles < BATCH_SHINGLES):
+            shingles += len(texts[end]) - shingle_size + 1
+            end += 1
+        hashes, offsets = _shingle_hashes(texts[start:end], shingle_size)
+        # Multiply-shift hashing: the top 32 bits of a * h + b (mod 2**64). One row
+        # per hash function keeps the per-text minimum a contiguous reduction
+        permuted = ((a[:, None] * hashes + b[:, None]) >> np.uint64(32)).astype(np.uint32)
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+    return signatures
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+def cluster_signatures(signatures, threshold=THRESHOLD):
+    """Group near-identical signatures. Returns, for every row, the position of
+    the first row of its cluster (itself if it has no duplicates)."""
+    n, num_perm = signatures.shape
+    bands, rows = lsh_bands(threshold, num_perm)
+    candidates = []
+    for band in range(bands):
+        # One 64-bit key per row for this band; equal keys share a bucket
+        keys = np.zeros(n, dtype=np.uint64)
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            keys = keys * np.uint64(1_000_003) + column.astype(np.uint64)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        new_bucket = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        bucket_first = order[np.maximum.accumulate(np.where(new_bucket, np.arange(n), 0))]
+        linked = bucket_first != order
+        # Link every member of a bucket to its first row
+        candidates.append(np.stack([bucket_first[linked], order[linked]], axis=1))
+
+    pairs = np.unique(np.concatenate(candidates), axis=0) if candidates else np.empty((0, 2), dtype=np.int64)
+    if len(pairs):
+        # LSH only proposes pairs; keep those whose signatures really agree
+        agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[agreement >= threshold]
+
+    parents = np.arange(n)
+    for first, other in pairs:
+        root_first, root_other = _find(parents, first), _find(parents, other)
+        if root_first != root_other:
+            parents[max(root_first, root_other)] = min(root_first, root_other)  # The first row is the root
+    return np.array([_find(parents, i) for i in range(n)]) if len(pairs) else parents
+
+def find_near_duplicates(comments, threshold=THRESHOLD, num_perm=NUM_PERM,
+                         shingle_size=SHINGLE_SIZE, min_chars=MIN_CHARS):
+    """Cluster the comments of a Series. Returns an array with, for every row,
+    the position of the row that represents its cluster (the first one)."""
+    texts = normalize(comments).to_numpy()
+    representatives = np.arange(len(texts))
+    long_enough = np.flatnonzero([len(text) >= max(min_chars, shingle_size) for text in texts])
+    if len(long_enough) > 1:
+        signatures = minhash_signatures(texts[long_enough].tolist(), num_perm, shingle_size)
+        representatives[long_enough] = long_enough[cluster_signatures(signatures, threshold)]
+    return representatives
+
+def drop_near_duplicates(df, column="comment", threshold=THRESHOLD, date_column="commented_date", **options):
+    """Keep the oldest comment of every near-duplicate cluster (by `date_column`;
+    the first one if the frame has no such column). Returns the filtered frame,
+    in its original order, and a report with one row per cluster that lost rows."""
+    order = np.arange(len(df))
+    if date_column in df.columns:
+        order = np.argsort(pd.to_datetime(df[date_column], errors="coerce").to_numpy(), kind="stable")  # Undated rows last
+    by_date = df.iloc[order]
+    representatives = find_near_duplicates(by_date[column], threshold, **options)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[order] = representatives == np.arange(len(df))
+    report = cluster_report(by_date, representatives, column)
+    return df[keep], report
+
+def cluster_report(df, representatives, column="comment"):
+    """Clusters with more than one row: size, the comment kept, an example
+    dropped and the games the copies come from, biggest first."""
+    members = pd.DataFrame({"cluster": representatives, "position": np.arange(len(df))})
+    members = members[members.groupby("cluster")["cluster"].transform("size") > 1]
+    if members.empty:
+        return pd.DataFrame(columns=["size", "kept", "dropped_example", "games"])
+    rows = df.iloc[members["position"].to_numpy()]
+    members["comment"] = rows[column].to_numpy()
+    members["game"] = rows["game"].to_numpy() if "game" in df.columns else ""
+    clusters = members.groupby("cluster")
+    report = pd.DataFrame({
+        "size": clusters.size(),
+        "kept": clusters["comment"].first(),
+        "dropped_example": clusters["comment"].agg(lambda comments: comments.iloc[1]),
+        "games": clusters["game"].agg(lambda games: ", ".join(sorted(set(map(str, games)))))
+    })
+    return report.sort_values("size", ascending=False).reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drop near-duplicate comments from a CSV with MinHash/LSH.")
+    parser.add_argument("input", help="CSV with a 'comment' column")
+    parser.add_argument("--output", help="Where to write the de-duplicated CSV")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Similarity (0-1) above which comments are duplicates")
+    parser.add_argument("--report", help="Where to write the cluster report CSV")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input)
+    start = time.perf_counter()
+    kept, report = drop_near_duplicates(df, threshold=args.threshold)
+    elapsed = time.perf_counter() - start
+    print(f"{len(df)} comments, {len(df) - len(kept)} near duplicates in {len(report)} clusters ({elapsed:.1f}s)")
+    print(report.head(20).to_string(max_colwidth=60))
+    if args.report:
+        report.to_csv(args.report, index=False)
+    if args.output:
+        kept.to_csv(args.output, index=False)
@@ -1,9 +1,14 @@
-import pandas as pd
-import re
-from textblob import TextBlob
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataset_store import DatasetWriter, dataset_rows, iter_dataset
+from feature_tagger import FeatureTagger
+from sentiment_cache import get_cache
 
-# Load your dataset
-df = pd.read_csv("visualizations\processed_reviews_textblob.csv", parse_dates=["commented_date"])
+# Columns of the reviews dataset the enhanced dataset keeps
+COLUMNS = ["genre", "game", "source", "commented_date", "commented", "comment_sentiment", "comment"]
+CHUNK_SIZE = 10000
+IN_FLIGHT_PER_WORKER = 2  # Chunks queued per worker: enough to keep it busy, few enough to bound memory
 
 # Define regex patterns for feature extraction
 feature_patterns = {
@@ -16,29 +21,63 @@ feature_patterns = {
     'updates': r"\b(patch|update|version|release|hotfix)\b",
     'price': r"\b(price|cost|expensive|cheap|worth|value)\b"
 }
-
-# Split into 10k-sized chunks
-chunk_size = 10000
-chunks = [df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size)]
+tagger = FeatureTagger(feature_patterns)  # All patterns in one compiled scan
 
 # Function to process a single chunk
 def process_chunk(chunk):
-    chunk['polarity'] = chunk['comment'].astype(str).apply(lambda x: TextBlob(x).sentiment.polarity)
-    chunk['subjectivity'] = chunk['comment'].astype(str).apply(lambda x: TextBlob(x).sentiment.subjectivity)
-    
-    for feature, pattern in feature_patterns.items():
-        chunk[f"{feature}_mentioned"] = chunk['comment'].astype(str).str.lower().apply(lambda x: bool(re.search(pattern, x)))
-    
+    # One score per distinct comment, shared with the other stages (and workers) through the cache
+    chunk['polarity'], chunk['subjectivity'] = get_cache().scores(chunk['comment'])
+
+    # One scan of the chunk tags every feature; the bitmask is expanded to one boolean column per feature
+    for feature, mentioned in tagger.expand(tagger.tag(chunk['comment'])).items():
+        chunk[f"{feature}_mentioned"] = mentioned
+
     return chunk
 
-# Process all chunks
-processed_chunks = []
-for i, chunk in enumerate(chunks):
-    print(f"Processing chunk {i+1}/{len(chunks)}...")
-    processed_chunks.append(process_chunk(chunk))
+def process_chunks(chunks, workers=1):
+    """Yield the processed chunks in input order. With several workers, chunks
+    are read lazily and at most IN_FLIGHT_PER_WORKER per worker are pending."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield process_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending, done, next_index = {}, {}, 0
+        chunks = enumerate(chunks)
+        exhausted = False
+        while not exhausted or pending:
+            while not exhausted and len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                try:
+                    i, chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(process_chunk, chunk)] = i
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done[pending.pop(future)] = future.result()
+            # Hand out finished chunks in order; later ones wait for the ones before them
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Add polarity, subjectivity and feature flags to the reviews dataset.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes working on chunks in parallel")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per chunk")
+    args = parser.parse_args()
 
-# Merge all chunks into one DataFrame
-processed_df = pd.concat(processed_chunks, ignore_index=True)
+    total = dataset_rows("reviews")
+    chunks = iter_dataset("reviews", columns=COLUMNS, chunk_size=args.chunk_size)
+    writer = DatasetWriter("enhanced")
+    start = time.perf_counter()
+    for chunk in process_chunks(chunks, args.workers):
+        writer.write(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"Processed {writer.rows}/{total} rows ({writer.rows / elapsed:.0f} rows/s)")
+    writer.close()
+    if args.workers <= 1:
+        print(get_cache().report())  # Worker processes keep their own hit counts
 
-# Save the full enhanced dataset
-processed_df.to_csv("enhanced_reviews_dataset.csv", index=False)
+if __name__ == "__main__":
+    main()
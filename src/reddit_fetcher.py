@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import praw
+import clients
+
+MAX_WORKERS = 4  # Posts whose comment trees are expanded at the same time (all games together)
+SEARCH_LIMIT = 50  # Posts searched per game
+REPLACE_MORE_LIMIT = 20  # 'MoreComments' stubs expanded per post
+RESERVE = 5  # Requests left untouched in every rate-limit window
+NEW_WINDOW = 60  # A reset time this many seconds later than the last one means a new window
+
+class RedditPacer:
+    """Spaces Reddit requests across all worker threads using the rate-limit
+    headers Reddit sends back (X-Ratelimit-Remaining / -Used / -Reset): the
+    requests left in the current window are spread evenly until it resets,
+    instead of sleeping a fixed time before every post.
+
+    wait() charges one request. A post costs more (the submission, then one
+    request per 'MoreComments' stub replace_more expands), so update() reads
+    how far the account's 'used' count moved and charges the requests wait()
+    did not: each pushes the next call back by one interval."""
+
+    def __init__(self, reserve=RESERVE):
+        self.reserve = reserve
+        self.lock = threading.Lock()
+        self.remaining = None  # Unknown until the first response
+        self.reset_at = None
+        self.used = None
+        self.charged = 0  # Requests charged by wait() since the last update
+        self.next_call = 0.0
+
+    def _interval(self, now):
+        """Seconds per request so the requests left last until the reset."""
+        if self.remaining is None:
+            return 0.0  # No headers yet, let the first calls through
+        if self.remaining <= self.reserve:
+            return max(self.reset_at - now, 0.0)  # Window used up: wait for the reset
+        return max(self.reset_at - now, 0.0) / (self.remaining - self.reserve)
+
+    def update(self, reddit):
+        """Read the latest rate-limit headers seen by a Reddit client and charge
+        the requests sent since the last update that wait() did not."""
+        limits = reddit.auth.limits
+        if limits.get("remaining") is None:
+            return
+        with self.lock:
+            now = time.time()
+            used = limits["used"] or 0
+            new_window = self.reset_at is not None and limits["reset_timestamp"] >= self.reset_at + NEW_WINDOW
+            if self.used is not None and not new_window and used < self.used:
+                return  # Older headers than the ones already seen (another thread's client)
+            sent = 0 if self.used is None else used if new_window else used - self.used
+            self.remaining = limits["remaining"]
+            self.reset_at = limits["reset_timestamp"]
+            self.used = used
+            extra = max(sent - self.charged, 0)
+            self.charged = 0
+            if extra:
+                # Never beyond the reset: the next window starts with a full budget
+                delay = min(extra * self._interval(now), max(self.reset_at - now, 0.0))
+                self.next_call = max(self.next_call, now) + delay
+
+    def wait(self):
+        """Block until this thread may send its next request."""
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_call)
+            self.next_call = start + self._interval(now)
+            self.charged += 1
+        if start > now:
+            time.sleep(start - now)
+
+_pacer = RedditPacer()
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """One bounded worker pool shared by every Reddit job of the process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="reddit-post")
+        return _pool
+
+def _expand_post(post_id):
+    """Load the comment tree of one post and return its (created_utc, body) pairs."""
+    reddit = clients.get_reddit()  # Each worker thread has its own client
+    _pacer.wait()
+    submission = reddit.submission(id=post_id)
+    submission.comments.replace_more(limit=REPLACE_MORE_LIMIT)
+    _pacer.update(reddit)
+    return [
+        (comment.created_utc, comment.body)
+        for comment in submission.comments.list()
+        if not isinstance(comment, praw.models.MoreComments)  # Skip 'MoreComments' objects
+    ]
+
+def fetch_comments(game):
+    """Search r/gaming for a game and expand the comment trees of the posts
+    found in parallel. Yields one list of (created_utc, body) pairs per post,
+    in search order."""
+    reddit = clients.get_reddit()
+    _pacer.wait()
+    post_ids = [post.id for post in reddit.subreddit("gaming").search(game, limit=SEARCH_LIMIT, time_filter="all")]
+    _pacer.update(reddit)
+
+    futures = [_get_pool().submit(_expand_post, post_id) for post_id in post_ids]
+    for post_id, future in zip(post_ids, futures):
+        try:
+            yield future.result()
+        except Exception as e:  # One broken post must not cost the whole game
+            print(f"\tSkipping Reddit post {post_id} for {game}: {e}")
@@ -0,0 +1,183 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import requests
+from clients import UPSTREAMS
+from scrape_engine import TokenBucket
+
+# Local stand-in for Reddit, YouTube, Steam and Metacritic. For Metacritic
+# only the top-level page goes through it: Chrome loads the page's assets and
+# review XHRs from their absolute URLs, so a replayed Metacritic page is
+# neither complete nor offline (benchmark_scrapers.py times saved pages instead).
+#   record: forward every request to the real upstream and store the response
+#   replay: answer from the stored responses only, with optional latency and
+#           429 rate-limit responses, so scrapers can be timed offline
+# Point the scrapers at it with SCRAPER_PROXY_URL=http://127.0.0.1:<port>;
+# a request to /<upstream>/<path> maps to UPSTREAMS[upstream] + /<path>.
+FIXTURE_DIR = "../fixtures"
+DEFAULT_PORT = 8765
+SECRET_PARAMS = {"key", "access_token"}  # Never part of a fixture key
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length", "host"}
+
+def fixture_key(method, path, query, body=b""):
+    """Stable key of a request: method, path, sorted query (minus secrets) and body."""
+    params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    request_line = f"{method} {path}?{urlencode(params)}".encode("utf-8")
+    return hashlib.sha1(request_line + body).hexdigest()
+
+class FixtureStore:
+    """Recorded responses, one JSON file per request under <root>/<upstream>/."""
+
+    def __init__(self, root=FIXTURE_DIR):
+        self.root = root
+
+    def _path(self, upstream, key):
+        return os.path.join(self.root, upstream, f"{key}.json")
+
+    def load(self, upstream, key):
+        """Return the stored response for a request, or None if it was never recorded."""
+        path = self._path(upstream, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, upstream, key, fixture):
+        """Store a response (status, headers and base64 body)."""
+        os.makedirs(os.path.join(self.root, upstream), exist_ok=True)
+        with open(self._path(upstream, key), "w", encoding="utf-8") as f:
+            json.dump(fixture, f)
+
+class ReplayServer(ThreadingHTTPServer):
+    """HTTP server that records or replays upstream responses and counts
+    the requests and bytes served per upstream."""
+    daemon_threads = True
+
+    def __init__(self, address, store, mode="replay", latency=0.0, jitter=0.0, rate_limit=None, burst=1):
+        super().__init__(address, ReplayHandler)
+        self.store = store
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        # One bucket per upstream; requests over the limit get a 429
+        self.buckets = {upstream: TokenBucket(rate_limit, burst) for upstream in UPSTREAMS} if rate_limit else {}
+        self.stats = {upstream: {"requests": 0, "bytes": 0, "throttled": 0, "missing": 0} for upstream in UPSTREAMS}
+        self.stats_lock = threading.Lock()
+
+    def count(self, upstream, field, amount=1):
+        with self.stats_lock:
+            self.stats[upstream][field] += amount
+
+    def snapshot(self):
+        """Copy of the per-upstream counters."""
+        with self.stats_lock:
+            return {upstream: dict(stats) for upstream, stats in self.stats.items()}
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real upstreams
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the scraper output
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _forward(self, upstream, path, query, body):
+        """Send the request to the real upstream and turn the answer into a fixture."""
+        url = f"{UPSTREAMS[upstream]}{path}" + (f"?{query}" if query else "")
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+        response = requests.request(self.command, url, headers=headers, data=body or None, timeout=60)
+        return {
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS},
+            "body": base64.b64encode(response.content).decode("ascii")
+        }
+
+    def _handle(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        upstream, _, path = parts.path.lstrip("/").partition("/")
+        path = f"/{path}"
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if upstream not in UPSTREAMS:
+            self._send(404, {"Content-Type": "text/plain"}, b"Unknown upstream")
+            return
+        key = fixture_key(self.command, path, parts.query, body)
+
+        if server.mode == "record":
+            try:
+                fixture = self._forward(upstream, path, parts.query, body)
+            except Exception as e:
+                self._send(502, {"Content-Type": "text/plain"}, f"Upstream error: {e}".encode("utf-8"))
+                return
+            server.store.save(upstream, key, fixture)
+        else:
+            bucket = server.buckets.get(upstream)
+            if bucket is not None and not bucket.try_acquire():
+                server.count(upstream, "throttled")
+                self._send(429, {"Content-Type": "application/json", "Retry-After": "1"}, b'{"error": 429}')
+                return
+            fixture = server.store.load(upstream, key)
+            if fixture is None:
+                server.count(upstream, "missing")
+                self._send(404, {"Content-Type": "text/plain"}, f"No fixture for {self.command} {self.path}".encode("utf-8"))
+                return
+            if server.latency or server.jitter:
+                time.sleep(server.latency + random.uniform(0, server.jitter))  # Simulated network delay
+
+        content = base64.b64decode(fixture["body"])
+        server.count(upstream, "requests")
+        server.count(upstream, "bytes", len(content))
+        self._send(fixture["status"], fixture["headers"], content)
+
+def start_server(store, mode="replay", port=0, **options):
+    """Start a ReplayServer in a background thread; port 0 picks a free port."""
+    server = ReplayServer(("127.0.0.1", port), store, mode, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay scraper HTTP traffic.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Fixture directory")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every replayed response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay, 0..jitter seconds")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests/sec per upstream before answering 429")
+    parser.add_argument("--burst", type=int, default=1, help="Requests allowed back to back under --rate-limit")
+    args = parser.parse_args()
+
+    server = ReplayServer(("127.0.0.1", args.port), FixtureStore(args.fixtures), args.mode,
+                          latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit, burst=args.burst)
+    print(f"{args.mode.capitalize()}ing fixtures in '{args.fixtures}'.")
+    print(f"Run the scrapers with SCRAPER_PROXY_URL=http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for upstream, stats in server.snapshot().items():
+            if stats["requests"] or stats["throttled"] or stats["missing"]:
+                print(f"{upstream}: {stats}")
+
+if __name__ == "__main__":
+    main()
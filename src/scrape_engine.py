@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Default limits per platform. Every platform gets its own worker pool and
+# token bucket, so a slow source never holds back the others.
+#   concurrency: number of (genre, game) jobs running at the same time
+#   rate:        jobs started per second (token refill rate)
+#   burst:       bucket capacity, i.e. how many jobs may start back to back
+PLATFORM_LIMITS = {
+    "reddit": {"concurrency": 2, "rate": 0.5, "burst": 1},
+    "youtube": {"concurrency": 4, "rate": 2.0, "burst": 2},
+    "steam": {"concurrency": 4, "rate": 1.0, "burst": 4},
+    "metacritic": {"concurrency": 2, "rate": 0.2, "burst": 1},
+}
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """Add the tokens earned since the last update (call with the lock held)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` tokens if available right now, without blocking."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available, then take them."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_time = (tokens - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+def platform_limits(platform, overrides=None):
+    """Merge the default limits of a platform with user overrides."""
+    limits = dict(PLATFORM_LIMITS.get(platform, {"concurrency": 1, "rate": 1.0, "burst": 1}))
+    if overrides and platform in overrides:
+        limits.update(overrides[platform])
+    return limits
+
+def _run_job(platform, bucket, scrape, job):
+    """Wait for a token, then run a single scraping job."""
+    bucket.acquire()
+    try:
+        scrape(*job)
+    except Exception as e:  # One failing game must not stop the whole queue
+        print(f"\tError in {platform} job {job[:2]}: {e}")
+
+def run_platforms(jobs, scrapers, limits=None):
+    """Run every platform as its own queue of jobs, all platforms concurrently.
+    `jobs` maps a platform to a list of argument tuples for `scrapers[platform]`.
+    Total wall time is set by the slowest platform, not by the sum of them."""
+    pools = {}
+    futures = {}
+    started = time.monotonic()
+    for platform, platform_jobs in jobs.items():
+        if not platform_jobs:
+            continue
+        cfg = platform_limits(platform, limits)
+        bucket = TokenBucket(cfg["rate"], cfg["burst"])
+        pools[platform] = ThreadPoolExecutor(max_workers=cfg["concurrency"], thread_name_prefix=platform)
+        futures[platform] = [
+            pools[platform].submit(_run_job, platform, bucket, scrapers[platform], job)
+            for job in platform_jobs
+        ]
+    # Report each platform as soon as its queue drains
+    pending = {platform: set(fs) for platform, fs in futures.items()}
+    while pending:
+        done, _ = wait(set().union(*pending.values()), return_when=FIRST_COMPLETED)
+        for platform in list(pending):
+            pending[platform] -= done
+            if not pending[platform]:
+                elapsed = time.monotonic() - started
+                print(f"{platform}: {len(futures[platform])} jobs finished in {elapsed:.1f}s")
+                del pending[platform]
+                pools[platform].shutdown()
+    print(f"All platforms finished in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import numpy as np
+from textblob import TextBlob
+from batch_polarity import batch_scores
+
+DB_FILE = "../data/.sentiment_cache.sqlite"
+MAX_ENTRIES = 2_000_000  # Least recently used scores are evicted above this many entries
+EVICT_TO = 0.9  # Eviction trims the cache to this share of MAX_ENTRIES, so it does not run on every batch
+QUERY_CHUNK = 500  # Keys per SQL statement (SQLite limits the number of parameters)
+
+def text_key(text):
+    """16-byte key of the exact text. Case and whitespace change TextBlob's
+    scores (emoticons like ":D", sentence breaks), so nothing is normalized."""
+    return hashlib.sha1(str(text).encode("utf-8")).digest()[:16]
+
+def textblob_scores(texts):
+    """(polarity, subjectivity) of every text, one TextBlob per text."""
+    scores = []
+    for text in texts:
+        sentiment = TextBlob(text).sentiment
+        scores.append((sentiment.polarity, sentiment.subjectivity))
+    return scores
+
+class SentimentCache:
+    """Polarity and subjectivity of every text scored so far, in SQLite, keyed
+    by the hash of the text. Shared by every pipeline stage (and every worker
+    process) through the same file.
+
+    scorer: function from a list of texts to a list of (polarity, subjectivity);
+            batch_scores gives the same scores as textblob_scores, faster
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, scorer=batch_scores):
+        self.path = path or DB_FILE
+        self.max_entries = max_entries
+        self.scorer = scorer
+        self.db = sqlite3.connect(self.path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")  # Readers do not block the writer
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS scores (
+            key BLOB PRIMARY KEY, polarity REAL, subjectivity REAL, used INTEGER
+        ) WITHOUT ROWID""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS scores_used ON scores(used)")
+        self.db.commit()
+        self.clock = self.db.execute("SELECT COALESCE(MAX(used), 0) FROM scores").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _lookup(self, keys):
+        found = {}
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            rows = self.db.execute(
+                f"SELECT key, polarity, subjectivity FROM scores WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((key, (polarity, subjectivity)) for key, polarity, subjectivity in rows)
+        return found
+
+    def scores(self, texts):
+        """Polarity and subjectivity arrays for a sequence (or Series) of texts.
+        Only texts not in the cache are scored; each distinct text once."""
+        texts = [str(text) for text in texts]
+        keys = [text_key(text) for text in texts]
+        unique = {}
+        for key, text in zip(keys, texts):
+            unique.setdefault(key, text)
+
+        self.clock += 1
+        found = self._lookup(list(unique))
+        hit_keys = list(found)
+        missing = [key for key in unique if key not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+        with self.db:
+            if missing:
+                computed = self.scorer([unique[key] for key in missing])
+                found.update(zip(missing, computed))
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                    ((key, *found[key], self.clock) for key in missing)
+                )
+            for start in range(0, len(hit_keys), QUERY_CHUNK):
+                chunk = hit_keys[start:start + QUERY_CHUNK]
+                self.db.execute(f"UPDATE scores SET used = ? WHERE key IN ({','.join('?' * len(chunk))})",
+                                [self.clock, *chunk])
+        if missing:
+            self._evict()
+
+        values = np.array([found[key] for key in keys], dtype=np.float64).reshape(-1, 2)
+        return values[:, 0], values[:, 1]
+
+    def score(self, text):
+        """(polarity, subjectivity) of one text."""
+        polarity, subjectivity = self.scores([text])
+        return polarity[0], subjectivity[0]
+
+    def entries(self):
+        return self.db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def _evict(self):
+        """Drop the least recently used scores once the cache is over its size."""
+        entries = self.entries()
+        if entries <= self.max_entries:
+            return
+        excess = entries - int(self.max_entries * EVICT_TO)
+        with self.db:
+            self.db.execute("DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY used LIMIT ?)", (excess,))
+        self.evicted += excess
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evicted": self.evicted,
+            "entries": self.entries()
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (f"Sentiment cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate), {stats['evicted']} evicted, {stats['entries']} entries")
+
+    def close(self):
+        self.db.close()
+
+_caches = {}
+
+def get_cache(path=None):
+    """Return this process's cache for `path` (connections are not shared across processes)."""
+    path = path or DB_FILE
+    key = (os.getpid(), path)
+    if key not in _caches:
+        _caches[key] = SentimentCache(path)
+    return _caches[key]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or trim the sentiment score cache.")
+    parser.add_argument("--path", default=DB_FILE)
+    parser.add_argument("--max-entries", type=int, default=None, help="Evict least recently used scores down to this size")
+    args = parser.parse_args()
+
+    cache = SentimentCache(args.path, max_entries=args.max_entries or MAX_ENTRIES)
+    if args.max_entries is not None:
+        cache._evict()
+    size = sum(os.path.getsize(f"{args.path}{suffix}") for suffix in ("", "-wal") if os.path.exists(f"{args.path}{suffix}"))
+    print(f"{cache.entries()} scores in {args.path} ({size / 1e6:.1f} MB), {cache.evicted} evicted")
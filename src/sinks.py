@@ -0,0 +1,107 @@
+import csv
+import io
+import os
+
+COMMENT_COLUMNS = ["genre", "game", "commented_date", "comment"]
+BATCH_SIZE = 500  # Rows buffered before they are written to disk
+FSYNC_POLICIES = ("never", "batch", "close")
+
+class CsvSink:
+    """Streams scraped rows into a CSV file in batches.
+
+    Rows pushed with `write` are buffered and appended to the file every
+    `batch_size` rows, so memory stays flat and a crash loses at most one batch.
+    mode:     "a" appends to an existing file, "w" replaces it: rows go to
+              `<file>.part`, which takes the place of the old file only when
+              the sink is closed without an error (a failed crawl leaves the
+              old file as it was)
+    resume:   with "w", append to the `.part` file of an interrupted run
+              instead of starting it over
+    fsync:    "never", "batch" (after every flush) or "close" (once at the end)
+    on_flush: called after every flush, e.g. to save a scraper checkpoint that
+              matches the rows now on disk
+    """
+
+    def __init__(self, file_path, columns=COMMENT_COLUMNS, batch_size=BATCH_SIZE,
+                 fsync="never", mode="a", resume=False, on_flush=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.file_path = file_path
+        self.columns = columns
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.mode = mode
+        self.resume = resume
+        self.path = f"{file_path}.part" if mode == "w" else file_path  # Where rows are written
+        self.on_flush = on_flush
+        self.buffer = []
+        self.file = None
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.batches = 0
+
+    def _open(self):
+        """Open the file on the first flush and write the header if it is new."""
+        append = self.mode == "a" or self.resume
+        if append and os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self.file = open(self.path, "ab")
+            return b""
+        self.file = open(self.path, "wb")
+        return self._encode([self.columns])
+
+    def _encode(self, rows):
+        text = io.StringIO()
+        csv.writer(text, lineterminator="\n").writerows(rows)
+        return text.getvalue().encode("utf-8")
+
+    def write(self, rows):
+        """Buffer rows and flush once a full batch is waiting."""
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the file."""
+        if not self.buffer:
+            return
+        data = self._open() if self.file is None else b""
+        data += self._encode(self.buffer)
+        self.file.write(data)
+        self.file.flush()
+        if self.fsync == "batch":
+            os.fsync(self.file.fileno())
+        self.rows_written += len(self.buffer)
+        self.bytes_written += len(data)
+        self.batches += 1
+        self.buffer = []
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def close(self):
+        """Flush what is left and close the file. With "w", the new file then
+        replaces the old one (unless nothing was written)."""
+        self.flush()
+        if self.file is not None:
+            if self.fsync == "close":
+                os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+        if self.mode == "w" and (self.batches or self.resume) and os.path.exists(self.path):
+            os.replace(self.path, self.file_path)
+
+    def abort(self):
+        """Close the file without flushing the buffer. The old file is kept;
+        "w" rows written so far stay in the `.part` file for `resume`."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()  # Buffered rows are not covered by any checkpoint yet: drop them
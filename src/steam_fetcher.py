@@ -0,0 +1,138 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import clients
+from scrape_engine import TokenBucket
+
+SHARDS = 8  # Date windows between the release date and today
+MAX_WORKERS = 4  # Windows fetched at the same time
+REQUESTS_PER_SECOND = 4.0  # Shared by all windows of all games
+STEAM_REVIEWS_START = datetime(2013, 11, 1, tzinfo=timezone.utc)  # Steam user reviews went live
+RELEASE_DATE_FORMATS = ["%d %b, %Y", "%b %d, %Y", "%d %B, %Y", "%B %d, %Y"]
+
+_bucket = TokenBucket(REQUESTS_PER_SECOND, REQUESTS_PER_SECOND)
+
+def throttle():
+    """Wait for a slot in the shared Steam request budget (call before every appreviews request)."""
+    _bucket.acquire()
+
+def release_timestamp(app_id):
+    """Release date of a Steam app (unix seconds) from the store API, or None."""
+    try:
+        response = clients.get_steam_session().get(
+            f"{clients.endpoint('steam')}/api/appdetails",
+            params={"appids": app_id, "filters": "release_date"}
+        )
+        date_text = response.json()[str(app_id)]["data"]["release_date"]["date"]
+    except Exception:
+        return None
+    for date_format in RELEASE_DATE_FORMATS:
+        try:
+            return int(datetime.strptime(date_text, date_format).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            continue
+    return None
+
+def date_shards(start, end, count=SHARDS):
+    """Split [start, end] (unix seconds) into `count` windows, newest first.
+    One extra window covers everything before `start` (e.g. early access)."""
+    history_start = int(STEAM_REVIEWS_START.timestamp())
+    start = max(start, history_start)
+    step = max((end - start) // count, 1)
+    edges = [start + i * step for i in range(count)] + [end]
+    shards = [(edges[i], edges[i + 1] - 1 if i + 1 < count else end) for i in range(count)]
+    if start > history_start:
+        shards.append((history_start, start - 1))
+    return shards[::-1]
+
+class ReviewBudget:
+    """Shared cap on the number of reviews collected by all shards."""
+
+    def __init__(self, max_reviews=None):
+        self.left = max_reviews
+        self.lock = threading.Lock()
+
+    def exhausted(self):
+        with self.lock:
+            return self.left is not None and self.left <= 0
+
+    def take(self, reviews):
+        """Keep as many reviews as the budget still allows."""
+        with self.lock:
+            if self.left is None:
+                return reviews
+            reviews = reviews[:max(self.left, 0)]
+            self.left -= len(reviews)
+            return reviews
+
+def _fetch_shard(url, shard, seen, seen_lock, budget, pages):
+    """Follow the cursor chain of one date window, newest review first."""
+    start, end = shard
+    session = clients.get_steam_session()
+    cursor, used_cursors = "*", set()
+    while not budget.exhausted():
+        throttle()
+        response = session.get(url, params={
+            "cursor": cursor,
+            "start_date": start,
+            "end_date": end,
+            "date_range_type": "include"
+        })
+        data = response.json()
+        if "reviews" not in data:
+            raise RuntimeError(f"no reviews in response for window {shard}")
+
+        page = []
+        reached_start = False
+        for review in data["reviews"]:
+            if review["timestamp_created"] < start:
+                reached_start = True  # Older than this window: the next shard has it
+                break
+            if review["timestamp_created"] > end:
+                continue  # Newer than this window: the previous shard has it
+            with seen_lock:
+                if review["recommendationid"] in seen:
+                    continue  # Same review returned twice
+                seen.add(review["recommendationid"])
+            page.append(review)
+        page = budget.take(page)
+        if page:
+            pages.put(page)
+
+        # Stop at the start of the window, at the end of the history, or on a repeated cursor
+        used_cursors.add(cursor)
+        next_cursor = data.get("cursor")
+        if reached_start or not data["reviews"] or not next_cursor or next_cursor in used_cursors:
+            break
+        cursor = next_cursor
+
+def fetch_reviews(app_id, start=None, end=None, shards=SHARDS, max_reviews=None, max_workers=MAX_WORKERS):
+    """Fetch the review history of a Steam app split into date windows that
+    are read in parallel. Reviews are de-duplicated by 'recommendationid'.
+    Yields one list of raw review dicts per page, as pages arrive, then raises
+    RuntimeError if any window failed."""
+    if start is None:
+        start = release_timestamp(app_id) or int(STEAM_REVIEWS_START.timestamp())
+    if end is None:
+        end = int(datetime.now(timezone.utc).timestamp())
+    url = f"{clients.endpoint('steam')}/appreviews/{app_id}?json=1&num_per_page=100&filter=recent"
+    windows = date_shards(start, end, shards)
+    seen, seen_lock = set(), threading.Lock()
+    budget = ReviewBudget(max_reviews)
+    pages = queue.Queue()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="steam-shard") as pool:
+        futures = [pool.submit(_fetch_shard, url, window, seen, seen_lock, budget, pages) for window in windows]
+        while True:
+            finished = all(future.done() for future in futures)
+            try:
+                yield pages.get(timeout=0.1)
+            except queue.Empty:
+                if finished:
+                    break  # All shards done and every page handed out
+        failed = [(window, future.exception()) for window, future in zip(windows, futures)
+                  if future.exception() is not None]
+        if failed:  # Raised after the other windows' pages, so the caller can tell the history is incomplete
+            raise RuntimeError(f"{len(failed)} of {len(windows)} Steam windows of app {app_id} failed: "
+                               + "; ".join(f"{window}: {error}" for window, error in failed))
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Unit cost of every YouTube Data API call the scraper makes
+QUOTA_COSTS = {
+    "search.list": 100,
+    "videos.list": 1,
+    "commentThreads.list": 1
+}
+DAILY_QUOTA = 10000  # Default quota of a YouTube API project
+SEARCH_RESULTS = 50  # API maximum for search.list
+PLAN_MAX_AGE_DAYS = 7  # Re-run the (expensive) search once a game's plan is this old
+PLAN_FILE = "../data/.youtube_plan.json"
+
+# The quota resets at midnight Pacific time (DST is ignored: being off by an
+# hour at the day boundary only shifts when the budget refills)
+QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+class QuotaExceeded(Exception):
+    """Raised when a call would go over the quota left for today or for a game."""
+
+def quota_day():
+    """The quota day we are in, as 'YYYY-MM-DD'."""
+    return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+class QuotaPlanner:
+    """Keeps track of the YouTube quota spent today and of the video plan per
+    (genre, game) job (videos ordered by comment count, most first), both saved
+    in one JSON file so the plan survives between runs. Plans are keyed
+    "genre:game", like the checkpoints: a game listed under two genres is two
+    jobs with a plan each.
+
+    The jobs registered for a run share what is left of the daily quota: each
+    job gets an equal slice of the unreserved units when it starts, and whatever
+    it does not spend goes back to the pool for the jobs after it."""
+
+    def __init__(self, path=None, daily_quota=DAILY_QUOTA):
+        self.path = path or PLAN_FILE
+        self.daily_quota = daily_quota
+        self.lock = threading.RLock()
+        self.pending = set()  # (genre, game) jobs of this run that have not started yet
+        self.reserved = {}  # Job -> units reserved and not spent yet
+        self.plan = {"games": {}}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.plan = json.load(f)
+        self._roll_day()
+
+    def _roll_day(self):
+        """Start a new quota day if the date changed."""
+        if self.plan.get("day") != quota_day():
+            self.plan["day"] = quota_day()
+            self.plan["spent"] = 0
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.plan, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def remaining(self):
+        with self.lock:
+            self._roll_day()
+            return self.daily_quota - self.plan["spent"]
+
+    def register(self, jobs):
+        """Announce the (genre, game) jobs of this run so the quota is spread across them."""
+        with self.lock:
+            self.pending.update(jobs)
+
+    def start_game(self, job):
+        """Reserve the share of the remaining quota for a (genre, game) job and return it."""
+        with self.lock:
+            self.pending.discard(job)
+            unreserved = self.remaining - sum(self.reserved.values())
+            self.reserved[job] = max(0, unreserved // (len(self.pending) + 1))
+            return self.reserved[job]
+
+    def finish_game(self, job):
+        """Return the unspent part of a job's share to the pool."""
+        with self.lock:
+            self.reserved.pop(job, None)
+
+    def spend(self, job, call, count=1):
+        """Book the cost of `count` API calls for a job, or raise QuotaExceeded."""
+        cost = QUOTA_COSTS[call] * count
+        with self.lock:
+            allowance = self.reserved.get(job, self.remaining)
+            if cost > self.remaining or cost > allowance:
+                raise QuotaExceeded(f"{call} needs {cost} units, {min(allowance, self.remaining)} left for {job[1]}")
+            self.plan["spent"] += cost
+            if job in self.reserved:
+                self.reserved[job] -= cost
+            self._save()
+
+    def exhaust(self):
+        """Mark today's quota as used up (the API answered 'quotaExceeded')."""
+        with self.lock:
+            self._roll_day()
+            self.plan["spent"] = self.daily_quota
+            self._save()
+
+    def videos(self, youtube, job):
+        """Video ids for a (genre, game) job, most-commented first. The plan is
+        reused for PLAN_MAX_AGE_DAYS, which saves a 100-unit search on every run."""
+        genre, game = job
+        key = f"{genre}:{game}"
+        with self.lock:
+            entry = self.plan["games"].get(key)
+        if entry:
+            age = datetime.now(QUOTA_TIMEZONE).date() - datetime.strptime(entry["planned"], '%Y-%m-%d').date()
+            if age.days < PLAN_MAX_AGE_DAYS:
+                return [video["id"] for video in entry["videos"]]
+
+        self.spend(job, "search.list")
+        search_response = youtube.search().list(
+            q=game,
+            part="id",
+            maxResults=SEARCH_RESULTS,
+            type="video"
+        ).execute()
+        ids = [item["id"]["videoId"] for item in search_response.get("items", []) if item["id"].get("videoId")]
+
+        counts = {}
+        if ids:
+            self.spend(job, "videos.list")  # Up to 50 ids per call
+            stats_response = youtube.videos().list(part="statistics", id=",".join(ids), maxResults=SEARCH_RESULTS).execute()
+            for item in stats_response.get("items", []):
+                counts[item["id"]] = int(item["statistics"].get("commentCount", 0))
+        # Videos without comments (or with comments disabled) would waste a call each
+        videos = sorted(
+            ({"id": video_id, "comments": counts[video_id]} for video_id in ids if counts.get(video_id)),
+            key=lambda video: video["comments"],
+            reverse=True
+        )
+        with self.lock:
+            self.plan["games"][key] = {"planned": quota_day(), "videos": videos}
+            self._save()
+        return [video["id"] for video in videos]
+
+_planner = None
+_planner_lock = threading.Lock()
+
+def get_planner():
+    """Return the process-wide quota planner."""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = QuotaPlanner()
+        return _planner